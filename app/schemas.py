@@ -1,5 +1,8 @@
 # app/schemas.py
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 class EmailRequest(BaseModel):
-    send_email: bool = True
\ No newline at end of file
+    send_email: bool = True
+    destinatarios: Optional[Union[str, List[str]]] = None
+    equipo: Optional[str] = None  # alias ("data") o nombre del equipo; None = todos
\ No newline at end of file
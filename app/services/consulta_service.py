@@ -0,0 +1,119 @@
+# Consultas JSON sobre el dataset del reporte, indexado en memoria por equipo, proyecto y versión
+import os
+import logging
+import unicodedata
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.report_service import _alias_equipo, obtener_dataset  # Alias de equipo y dataset cacheado
+from app.utils.file_manager import COLUMNAS_REPORTE  # Columnas del reporte en orden
+from app.utils import snapshot_store  # Ubicación del histórico (para invalidar el índice)
+
+# Convierte un nombre de columna en clave JSON ("Horas consumidas" → "horas_consumidas")
+def _clave(col: str) -> str:
+    txt = unicodedata.normalize("NFKD", col).encode("ascii", "ignore").decode()
+    return "_".join(txt.lower().split())
+
+CAMPOS = {_clave(c): c for c in ["Equipo"] + COLUMNAS_REPORTE}
+PORCENTAJES = ("Progreso tareas", "Horas consumidas")
+LIMITE_MAXIMO = 1000
+
+# Fila del reporte → dict JSON (claves slug, porcentajes numéricos, fechas ISO)
+def _a_json(r: Dict[str, Any]) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"alias": _alias_equipo(r.get("Equipo") or "")}
+    for clave, col in CAMPOS.items():
+        v = r.get(col)
+        if col in PORCENTAJES and isinstance(v, str):
+            v = float(v.rstrip("%") or 0)
+        elif isinstance(v, date):
+            v = v.isoformat()
+        item[clave] = v
+    return item
+
+
+class IndiceDataset:
+    """Filas del reporte con índices invertidos por equipo/proyecto/versión y órdenes precalculados."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.filas = [_a_json(r) for r in rows]
+        self.por_equipo: Dict[str, Set[int]] = defaultdict(set)
+        self.por_proyecto: Dict[str, Set[int]] = defaultdict(set)
+        self.por_version: Dict[str, Set[int]] = defaultdict(set)
+        self._ordenes: Dict[str, Tuple[List[int], List[int]]] = {}
+
+        for idx, f in enumerate(self.filas):
+            self.por_equipo[f["alias"]].add(idx)
+            self.por_equipo[(f["equipo"] or "").lower()].add(idx)
+            self.por_proyecto[(f["proyecto"] or "").lower()].add(idx)
+            self.por_version[(f["version"] or "").lower()].add(idx)
+
+    def _orden(self, campo: str, desc: bool = False) -> List[int]:
+        """Posiciones ordenadas por `campo` con los nulos al final; se calcula una vez por campo."""
+        if campo not in self._ordenes:
+            con_valor = sorted(
+                (i for i, f in enumerate(self.filas) if f[campo] is not None),
+                key=lambda i: self.filas[i][campo],
+            )
+            nulos = [i for i, f in enumerate(self.filas) if f[campo] is None]
+            self._ordenes[campo] = (con_valor, nulos)
+        con_valor, nulos = self._ordenes[campo]
+        return (con_valor[::-1] if desc else con_valor) + nulos
+
+    def consultar(
+        self,
+        equipo: Optional[str] = None,
+        proyecto: Optional[str] = None,
+        version: Optional[str] = None,
+        sort: Optional[str] = None,
+        order: str = "asc",
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        if sort is not None and sort not in CAMPOS:
+            raise ValueError(f"Campo de orden desconocido: {sort}. Opciones: {', '.join(CAMPOS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order debe ser 'asc' o 'desc'")
+
+        # Intersección de índices, empezando por el conjunto más chico
+        conjuntos = [
+            indice.get(valor.strip().lower(), set())
+            for indice, valor in ((self.por_equipo, equipo), (self.por_proyecto, proyecto), (self.por_version, version))
+            if valor
+        ]
+        seleccion: Optional[Set[int]] = None
+        for c in sorted(conjuntos, key=len):
+            seleccion = c if seleccion is None else seleccion & c
+
+        orden = self._orden(sort, order == "desc") if sort else range(len(self.filas))
+
+        posiciones = [i for i in orden if seleccion is None or i in seleccion]
+        limit = max(0, min(limit, LIMITE_MAXIMO))
+        offset = max(0, offset)
+        return {
+            "total": len(posiciones),
+            "limit": limit,
+            "offset": offset,
+            "items": [self.filas[i] for i in posiciones[offset:offset + limit]],
+        }
+
+# ──────────────── Índice cacheado ────────────────
+# Se reconstruye solo cuando cambia el archivo de snapshots (nueva corrida del reporte)
+_indice: Optional[IndiceDataset] = None
+_indice_version: Optional[float] = None
+
+def _version_snapshot() -> Optional[float]:
+    try:
+        return os.path.getmtime(snapshot_store.SNAPSHOT_DB)
+    except OSError:
+        return None
+
+def obtener_indice(refrescar: bool = False) -> IndiceDataset:
+    global _indice, _indice_version
+    version = _version_snapshot()
+    if refrescar or _indice is None or version is None or version != _indice_version:
+        data = obtener_dataset(refrescar=refrescar)
+        _indice = IndiceDataset(data)
+        _indice_version = _version_snapshot()
+        logging.info("🔎 Índice del dataset reconstruido: %s versiones", len(_indice.filas))
+    return _indice
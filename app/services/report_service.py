@@ -1,16 +1,23 @@
 # Importación de módulos estándar y externos
+import os
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Sequence, Union
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
 from fastapi import BackgroundTasks
 from redminelib.exceptions import AuthError, ForbiddenError
 
 # Importación de funciones utilitarias del proyecto
-from app.utils.redmine_client import get_projects, process_projects  # Obtiene y procesa proyectos desde Redmine
-from app.utils.file_manager import data_to_html  # Convierte datos a formato HTML para emails
+from app.utils.redmine_client import get_projects, procesar_por_equipo, subarbol_equipo  # Obtiene y procesa proyectos desde Redmine
+from app.utils.file_manager import data_to_html, data_to_html_partes  # Convierte datos a formato HTML para emails
 from app.utils.gestor_mails import destinatarios_equipo, get_destinatarios  # Obtiene destinatarios según alias o lista directa
 from app.utils.email_utils import send_html_email  # Función para enviar emails con contenido HTML
 from app.utils.fecha import generar_fecha_reporte  # Genera una cadena con la fecha actual en formato legible
+from app.utils.checkpoint import run_id_del_dia, cerrar_checkpoint, limpiar_checkpoints  # Corridas reanudables
+from app.utils.snapshot_store import guardar_snapshot, fecha_ultimo_snapshot, ultimo_snapshot  # Histórico diario de métricas
+
+# Formato de los mails (.env): HTML compacto con <style> y, opcionalmente, partido en varios mensajes
+EMAIL_HTML_COMPACTO = os.getenv("EMAIL_HTML_COMPACTO", "true").lower() == "true"
+EMAIL_MAX_KB = int(os.getenv("EMAIL_MAX_KB", 0))  # 0 = no partir
 
 # Función para convertir un texto en slug (minúsculas, sin caracteres especiales, separado por "_")
 def _slug(text: str) -> str:
@@ -37,27 +44,83 @@ def _alias_equipo(nombre: str) -> str:
 def _filtrar(data: List[Dict[str, Any]], equipo: str) -> List[Dict[str, Any]]:
     return [r for r in data if (r.get("Equipo") or "").strip() == equipo]
 
+# Indica si el nombre de un equipo corresponde al alias ("data") o al nombre completo indicado
+def _es_equipo(nombre: str, equipo: str) -> bool:
+    equipo = equipo.strip().lower()
+    return _alias_equipo(nombre) == equipo or nombre.strip().lower() == equipo
+
+# Filtra por alias de equipo ("data") o por nombre completo del equipo
+def _filtrar_alias(data: List[Dict[str, Any]], equipo: str) -> List[Dict[str, Any]]:
+    return [r for r in data if _es_equipo(r.get("Equipo") or "", equipo)]
+
+# Obtiene y procesa los proyectos desde Redmine y guarda el snapshot del día.
+# Con `run_id`, los proyectos ya procesados en un intento anterior se toman del checkpoint.
+# Con `equipo`, solo se recorre el subárbol de ese equipo (el resto no genera requests).
+def obtener_datos(run_id: Optional[str] = None, equipo: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [fila for _, filas in obtener_datos_por_equipo(run_id, equipo) for fila in filas]
+
+# Igual que obtener_datos, pero entrega (equipo, filas) a medida que termina cada equipo.
+# El snapshot se guarda recién cuando se recorrieron todos; con `equipo`, solo reemplaza el de ese equipo.
+def obtener_datos_por_equipo(
+    run_id: Optional[str] = None, equipo: Optional[str] = None
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    projects = get_projects()
+    if equipo:
+        projects = subarbol_equipo(projects, lambda nombre: _es_equipo(nombre, equipo))
+        logging.info("🎯 Equipo %s: %s proyectos en su subárbol", equipo, len(projects))
+
+    data = []
+    for nombre, filas in procesar_por_equipo(projects, run_id=run_id):
+        data.extend(filas)
+        yield nombre, filas
+
+    # El histórico no debe frenar el reporte si falla
+    try:
+        guardar_snapshot(data, alias_de=_alias_equipo)
+    except Exception as e:
+        logging.warning("⚠️  No se pudo guardar el snapshot: %s", e)
+
+# Arma el/los HTML de un mail; si se parte, el asunto lleva " (i/n)"
+def _mensajes(subject: str, rows: List[Dict[str, Any]]) -> List[tuple]:
+    if EMAIL_HTML_COMPACTO and EMAIL_MAX_KB:
+        partes = data_to_html_partes(rows, EMAIL_MAX_KB * 1024)
+        if len(partes) > 1:
+            return [(f"{subject} ({n}/{len(partes)})", html) for n, html in enumerate(partes, start=1)]
+        return [(subject, partes[0])]
+    return [(subject, data_to_html(rows, compacto=EMAIL_HTML_COMPACTO))]
+
+# Dataset del último snapshot guardado; solo consulta Redmine si no hay ninguno o se pide refrescar
+def obtener_dataset(equipo: Optional[str] = None, refrescar: bool = False) -> List[Dict[str, Any]]:
+    if not refrescar and fecha_ultimo_snapshot() is not None:
+        data = ultimo_snapshot()
+    else:
+        data = obtener_datos(equipo=equipo)
+    return _filtrar_alias(data, equipo) if equipo else data
+
 # Función principal que genera el reporte y, si corresponde, envía los mails
 def generate_report(
     send_email: bool = True,  # Indica si se debe enviar el mail
     destinatarios: Optional[Union[str, Sequence[str]]] = None,  # Destinatarios opcionales (manuales)
-    background_tasks: Optional[BackgroundTasks] = None  # Para enviar mails en segundo plano en FastAPI
+    background_tasks: Optional[BackgroundTasks] = None,  # Para enviar mails en segundo plano en FastAPI
+    run_id: Optional[str] = None,  # Corrida a reanudar (por defecto, la de hoy)
+    equipo: Optional[str] = None  # Alias o nombre de un equipo: solo se recorre y envía ese equipo
 ) -> str:
     try:
         logging.info("🔄 Generando reporte de proyectos por equipo…")
 
-        # Obtiene los proyectos desde Redmine y los procesa
-        projects = get_projects()
-        data = process_projects(projects)
+        # Obtiene los proyectos desde Redmine y los procesa, reanudando el intento previo de hoy si falló
+        run_id = run_id or run_id_del_dia(_slug(equipo) if equipo else "todos")
+        limpiar_checkpoints()
+        data = obtener_datos(run_id=run_id, equipo=equipo)
         logging.info("✅ Proyectos procesados: %s", len(data))
 
         # Si se especifican destinatarios, se envía un único reporte general
         if destinatarios:
-            html_all = data_to_html(data)  # Convierte todo el reporte a HTML
             subject = (
                 "KZN-REDMINE - Reporte de avance de proyectos y tareas al "
                 + generar_fecha_reporte()
-                + " - EQUIPO TODOS"
+                + " - EQUIPO "
+                + (equipo.upper() if equipo else "TODOS")
             )
 
             # Si los destinatarios se pasaron como string, se resuelven usando la función
@@ -67,7 +130,10 @@ def generate_report(
                 else list(destinatarios)
             )
 
-            send_html_email(subject, html_all, recip)  # Envío directo del correo
+            # Convierte todo el reporte a HTML y lo envía directo
+            for asunto, html_all in _mensajes(subject, data):
+                send_html_email(asunto, html_all, recip)
+            cerrar_checkpoint(run_id)
             return "Reporte manual enviado"
 
         # Si no se especificaron destinatarios, se genera y envía un reporte por equipo
@@ -82,7 +148,6 @@ def generate_report(
                 logging.info("⏭ %s sin destinatarios; se omite", eq)
                 continue  # Si no hay destinatarios, se saltea ese equipo
 
-            html = data_to_html(_filtrar(data, eq))  # Convierte en HTML solo los registros de ese equipo
             subject = (
                 "KZN-REDMINE - Reporte de avance de proyectos y tareas al "
                 + generar_fecha_reporte()
@@ -91,15 +156,18 @@ def generate_report(
             )
 
             # Envío del email (en segundo plano si se usa FastAPI con background_tasks)
+            # Convierte en HTML solo los registros de ese equipo
             if send_email:
-                if background_tasks:
-                    background_tasks.add_task(send_html_email, subject, html, recip)
-                else:
-                    send_html_email(subject, html, recip)
+                for asunto, html in _mensajes(subject, _filtrar(data, eq)):
+                    if background_tasks:
+                        background_tasks.add_task(send_html_email, asunto, html, recip)
+                    else:
+                        send_html_email(asunto, html, recip)
 
             enviados += 1  # Se contabiliza el envío
 
         logging.info("🎉 Reportes enviados: %s", enviados)
+        cerrar_checkpoint(run_id)
         return f"Reportes generados para {enviados} equipos"
 
     # Manejo de errores de autenticación o permisos en Redmine
@@ -0,0 +1,208 @@
+# app/utils/backfill.py
+"""
+Precarga en paralelo del histórico de time entries para cachés vacías (nodo nuevo o cache/ borrado):
+  • Por proyecto se pide primero una página; si alcanza, el shard queda listo con 1 request
+  • Si no, el histórico se parte en rangos de fechas que se descargan en paralelo
+    (BACKFILL_WORKERS hilos, siempre detrás del regulador de Redmine)
+  • Cada proyecto se escribe en el formato de la caché apenas terminan todos sus rangos
+  • Progreso y ETA en el log
+  • CLI: python -m app.utils.backfill [--proyectos 12 34] [--workers 8] [--dias 90] [--forzar]
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.cache_manager import _clave, _save_shard, bloqueo_shard, tiene_shard
+from app.utils.registros import PAGINA, pagina, paginas
+
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", 4))
+BACKFILL_DIAS_RANGO = int(os.getenv("BACKFILL_DIAS_RANGO", 90))
+
+Rango = Tuple[Optional[date], Optional[date]]
+
+
+def rangos_de_fechas(desde: date, hasta: date, dias: int) -> List[Rango]:
+    """Cortes consecutivos de `dias` días entre `desde` y `hasta`; el primero y el último quedan abiertos."""
+    rangos: List[Rango] = []
+    inicio: Optional[date] = None
+    corte = desde + timedelta(days=dias)
+    while corte <= hasta:
+        rangos.append((inicio, corte - timedelta(days=1)))
+        inicio = corte
+        corte += timedelta(days=dias)
+    rangos.append((inicio, None))
+    return rangos
+
+# ────────────────────────
+# DESCARGAS (se ejecutan en los workers)
+# ────────────────────────
+
+def _redmine():
+    from app.utils import redmine_client
+    return redmine_client.redmine
+
+
+def _primera_pagina(project_id) -> Tuple[List[Dict[str, Any]], int]:
+    return pagina(_redmine(), "time_entries", project_id=project_id, limit=PAGINA)
+
+
+def _rango(project_id, rango: Rango) -> List[Dict[str, Any]]:
+    desde, hasta = rango
+    filtros: Dict[str, Any] = {"project_id": project_id}
+    if desde:
+        filtros["from"] = desde.isoformat()
+    if hasta:
+        filtros["to"] = hasta.isoformat()
+    return list(paginas(_redmine(), "time_entries", **filtros))
+
+# ────────────────────────
+# PROGRESO
+# ────────────────────────
+
+class _Progreso:
+    """Cuenta tareas terminadas y loguea avance y ETA (como mucho cada `cada` segundos)."""
+
+    def __init__(self, cada: float = 2.0):
+        self.total = 0
+        self.hechas = 0
+        self.entries = 0
+        self.inicio = time.monotonic()
+        self.cada = cada
+        self._ultimo_log = 0.0
+        self._lock = threading.Lock()
+
+    def agregar(self, tareas: int) -> None:
+        with self._lock:
+            self.total += tareas
+
+    def avanzar(self, entries: int) -> None:
+        with self._lock:
+            self.hechas += 1
+            self.entries += entries
+            ahora = time.monotonic()
+            if ahora - self._ultimo_log < self.cada and self.hechas < self.total:
+                return
+            self._ultimo_log = ahora
+            transcurrido = ahora - self.inicio
+            eta = transcurrido / self.hechas * (self.total - self.hechas)
+            logging.info(
+                "⏳ Backfill: %s/%s descargas (%.0f%%) · %s time entries · %.0fs transcurridos · ETA %.0fs",
+                self.hechas, self.total, self.hechas / self.total * 100, self.entries, transcurrido, eta,
+            )
+
+# ────────────────────────
+# API PRINCIPAL
+# ────────────────────────
+
+def _fecha_creacion(prj) -> Optional[date]:
+    creado = getattr(prj, "created_on", None)
+    return creado.date() if hasattr(creado, "date") else creado
+
+
+def backfill(
+    projects: Iterable,
+    workers: int = BACKFILL_WORKERS,
+    dias: int = BACKFILL_DIAS_RANGO,
+    forzar: bool = False,
+) -> Dict[Any, int]:
+    """
+    Descarga el histórico completo de time entries de `projects` y escribe sus shards.
+    Salvo con `forzar`, se saltean los proyectos que ya tienen shard.
+    Devuelve la cantidad de time entries guardadas por project_id (sin los proyectos que fallaron).
+    """
+    pendientes = [p for p in projects if forzar or not tiene_shard(p.id)]
+    logging.info("📥 Backfill de time entries: %s proyectos, %s workers", len(pendientes), workers)
+
+    progreso = _Progreso()
+    progreso.agregar(len(pendientes))
+    acumulado: Dict[Any, List[Dict[str, Any]]] = {}
+    faltan: Dict[Any, int] = {}
+    fallidos = set()
+    guardados: Dict[Any, int] = {}
+
+    def _guardar(pid):
+        entries = acumulado.pop(pid)
+        # Bajo el mismo lock que el reporte: si una corrida guardó el shard mientras tanto, gana ella
+        with bloqueo_shard(pid):
+            if not forzar and tiene_shard(pid):
+                logging.info("🔒 Shard de %s guardado por otra corrida durante el backfill; se conserva", pid)
+                return
+            guardados[pid] = len(_save_shard(_clave(pid), entries))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futuros = {pool.submit(_primera_pagina, p.id): (p, None) for p in pendientes}
+        while futuros:
+            listos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+            for fut in listos:
+                prj, rango = futuros.pop(fut)
+                try:
+                    resultado = fut.result()
+                except Exception as exc:
+                    # Sin el histórico completo no se escribe el shard: lo descargará el reporte
+                    logging.warning("⚠️  Backfill proyecto %s%s falló: %s", prj.id, f" {rango}" if rango else "", exc)
+                    fallidos.add(prj.id)
+                    acumulado.pop(prj.id, None)
+                    progreso.avanzar(0)
+                    continue
+
+                if rango is None:
+                    entries, total = resultado
+                    progreso.avanzar(len(entries))
+                    acumulado[prj.id] = entries
+                    desde = _fecha_creacion(prj)
+                    if total <= len(entries):
+                        _guardar(prj.id)
+                        continue
+                    # Más de una página: el resto se parte en rangos de fechas
+                    rangos = rangos_de_fechas(desde, date.today(), dias) if desde else [(None, None)]
+                    faltan[prj.id] = len(rangos)
+                    progreso.agregar(len(rangos))
+                    for r in rangos:
+                        futuros[pool.submit(_rango, prj.id, r)] = (prj, r)
+                    continue
+
+                progreso.avanzar(len(resultado))
+                if prj.id in fallidos:
+                    continue
+                acumulado[prj.id].extend(resultado)
+                faltan[prj.id] -= 1
+                if not faltan[prj.id]:
+                    _guardar(prj.id)
+
+    logging.info(
+        "✅ Backfill terminado: %s shards, %s time entries, %s proyectos con error, %.0fs",
+        len(guardados), sum(guardados.values()), len(fallidos), time.monotonic() - progreso.inicio,
+    )
+    return guardados
+
+# ────────────────────────
+# CLI
+# ────────────────────────
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.backfill", description="Precarga el histórico de time entries en la caché")
+    parser.add_argument("--proyectos", type=int, nargs="*", help="IDs de proyecto (por defecto, todos los activos)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--dias", type=int, default=BACKFILL_DIAS_RANGO, help="Días por rango de fechas")
+    parser.add_argument("--forzar", action="store_true", help="Vuelve a descargar aunque el proyecto ya tenga shard")
+    args = parser.parse_args(argv)
+
+    from app.utils.redmine_client import get_projects
+
+    projects = get_projects()
+    if args.proyectos:
+        projects = [p for p in projects if p.id in set(args.proyectos)]
+
+    guardados = backfill(projects, args.workers, args.dias, args.forzar)
+    print(f"Shards escritos: {len(guardados)} · time entries: {sum(guardados.values())}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,483 @@
+# app/utils/cache_backend.py
+"""
+Dónde se guarda la caché (shards de time entries y estado incremental), según CACHE_BACKEND:
+  • archivos: un archivo por clave en CACHE_DIR, con escritura atómica (por defecto)
+  • sqlite:   tabla clave/valor en CACHE_SQLITE; varios procesos de un mismo host (WAL no
+              funciona sobre discos de red: para varios nodos, redis)
+  • redis:    servidor compatible con Redis en CACHE_REDIS_URL; varios nodos comparten la caché
+  • memoria:  RedisEnMemoria, el mismo protocolo sin servidor (pruebas y desarrollo)
+
+Todos ofrecen bloqueo(clave): un lock por clave con vencimiento, para que varios nodos
+no sincronicen el mismo proyecto a la vez. Mientras se usa, el lock se renueva solo.
+"""
+
+import os
+import time
+import uuid
+import fnmatch
+import sqlite3
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "archivos").lower()
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+CACHE_SQLITE = os.getenv("CACHE_SQLITE", os.path.join(CACHE_DIR, "cache.sqlite3"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_REDIS_PREFIJO = os.getenv("CACHE_REDIS_PREFIJO", "rmpy:")
+CACHE_LOCK_TTL = float(os.getenv("CACHE_LOCK_TTL", 300))  # segundos; un lock abandonado vence solo
+
+
+class BackendCache:
+    """Interfaz común: valores en bytes por clave y locks por clave."""
+
+    descripcion = ""
+
+    def leer(self, clave: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def escribir(self, clave: str, valor: bytes) -> None:
+        raise NotImplementedError
+
+    def borrar(self, clave: str) -> None:
+        raise NotImplementedError
+
+    def listar(self, prefijo: str = "") -> List[Dict[str, Any]]:
+        """Claves que empiezan con `prefijo`, con su tamaño (`bytes`) y última escritura (`mtime`)."""
+        raise NotImplementedError
+
+    def existe(self, clave: str) -> bool:
+        return self.leer(clave) is not None
+
+    def huerfanos(self) -> List[str]:
+        """Restos de escrituras interrumpidas (solo aplica a archivos)."""
+        return []
+
+    def borrar_huerfano(self, ruta: str) -> None:
+        pass
+
+    def _tomar(self, clave: str, token: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def _renovar(self, clave: str, token: str, ttl: float) -> bool:
+        """Extiende el vencimiento del lock propio; False si ya no es nuestro."""
+        raise NotImplementedError
+
+    def _soltar(self, clave: str, token: str) -> None:
+        raise NotImplementedError
+
+    def _mantener(self, clave: str, token: str, ttl: float, detener: threading.Event) -> None:
+        # Renueva cada ttl/3: una sincronización más larga que el TTL no pierde el lock
+        while not detener.wait(ttl / 3):
+            try:
+                if not self._renovar(clave, token, ttl):
+                    logging.warning("⚠️  Lock de caché %s vencido mientras se usaba", clave)
+                    return
+            except Exception as e:
+                logging.warning("⚠️  No se pudo renovar el lock de caché %s: %s", clave, e)
+
+    @contextmanager
+    def bloqueo(self, clave: str, ttl: float = CACHE_LOCK_TTL) -> Iterator[bool]:
+        """
+        Lock exclusivo sobre `clave` entre procesos/nodos que comparten el backend.
+        Si no se obtiene en `ttl` segundos se sigue sin lock (cede True/False según se obtuvo).
+        Mientras se tiene, un hilo lo renueva; el TTL solo corre si el dueño muere.
+        """
+        token = uuid.uuid4().hex
+        limite = time.monotonic() + ttl
+        pausa = 0.05
+        obtenido = self._tomar(clave, token, ttl)
+        while not obtenido and time.monotonic() < limite:
+            time.sleep(pausa)
+            pausa = min(pausa * 2, 1.0)
+            obtenido = self._tomar(clave, token, ttl)
+        if not obtenido:
+            logging.warning("⏱  Lock de caché %s sin liberar tras %.0fs; se continúa sin lock", clave, ttl)
+            yield False
+            return
+        detener = threading.Event()
+        renovador = threading.Thread(target=self._mantener, args=(clave, token, ttl, detener), name=f"lock-{clave}", daemon=True)
+        renovador.start()
+        try:
+            yield True
+        finally:
+            detener.set()
+            renovador.join()
+            self._soltar(clave, token)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.descripcion})"
+
+# ────────────────────────
+# ARCHIVOS LOCALES
+# ────────────────────────
+
+class BackendArchivos(BackendCache):
+    """Un archivo `<clave>.pkl` por clave; locks con archivos `.lock_<clave>` creados en exclusiva."""
+
+    def __init__(self, directorio: str = CACHE_DIR):
+        self.dir = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self.descripcion = os.path.abspath(directorio)
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.dir, f"{clave}.pkl")
+
+    def leer(self, clave: str) -> Optional[bytes]:
+        try:
+            with open(self._ruta(clave), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def escribir(self, clave: str, valor: bytes) -> None:
+        # Temporal en el mismo directorio + rename: nunca queda un archivo a medio escribir
+        fd, tmp = tempfile.mkstemp(dir=self.dir, prefix=".tmp_", suffix=".pkl")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(valor)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._ruta(clave))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def borrar(self, clave: str) -> None:
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+    def existe(self, clave: str) -> bool:
+        return os.path.exists(self._ruta(clave))
+
+    def listar(self, prefijo: str = "") -> List[Dict[str, Any]]:
+        claves = []
+        for name in os.listdir(self.dir):
+            if name.startswith(prefijo) and name.endswith(".pkl") and not name.startswith(".tmp_"):
+                st = os.stat(os.path.join(self.dir, name))
+                claves.append({"clave": name[:-len(".pkl")], "bytes": st.st_size, "mtime": datetime.fromtimestamp(st.st_mtime)})
+        return claves
+
+    def huerfanos(self) -> List[str]:
+        return [os.path.join(self.dir, n) for n in os.listdir(self.dir) if n.startswith(".tmp_")]
+
+    def borrar_huerfano(self, ruta: str) -> None:
+        os.remove(ruta)
+
+    def _ruta_lock(self, clave: str) -> str:
+        return os.path.join(self.dir, f".lock_{clave}")
+
+    def _tomar(self, clave: str, token: str, ttl: float) -> bool:
+        ruta = self._ruta_lock(clave)
+        try:
+            fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # Lock de un proceso que murió sin soltarlo: vence según lo que anotó su dueño
+            try:
+                antes = os.stat(ruta)
+                with open(ruta) as f:
+                    contenido = f.read()
+                try:
+                    vence = float(contenido.split()[1])
+                except (IndexError, ValueError):
+                    # Vacío (recién creado o a medio renovar) o ilegible: vence por la última escritura
+                    vence = antes.st_mtime + ttl
+                if time.time() > vence:
+                    self._descartar_vencido(ruta, token, antes, contenido)
+            except FileNotFoundError:
+                pass
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{token} {time.time() + ttl}")
+        return True
+
+    @staticmethod
+    def _descartar_vencido(ruta: str, token: str, antes: os.stat_result, contenido: str) -> None:
+        """
+        Borra el lock vencido sin pisar uno nuevo: entre leerlo y borrarlo otro nodo pudo
+        haberlo reemplazado (o renovado). Se aparta con un rename atómico a un nombre propio
+        y solo se borra si sigue siendo el mismo archivo con el mismo contenido.
+        """
+        aparte = f"{ruta}.vencido_{token}"
+        os.rename(ruta, aparte)
+        with open(aparte) as f:
+            mismo = os.fstat(f.fileno()).st_ino == antes.st_ino and f.read() == contenido
+        if mismo:
+            os.remove(aparte)
+            return
+        # Era un lock vigente de otro nodo: se devuelve a su lugar (link no pisa si ya hay otro)
+        try:
+            os.link(aparte, ruta)
+        except FileExistsError:
+            logging.warning("⚠️  Lock de caché %s reemplazado dos veces mientras se limpiaba", ruta)
+        os.remove(aparte)
+
+    def _renovar(self, clave: str, token: str, ttl: float) -> bool:
+        ruta = self._ruta_lock(clave)
+        try:
+            with open(ruta, "r+") as f:
+                if f.read().split()[:1] != [token]:
+                    return False
+                f.seek(0)
+                f.truncate()
+                f.write(f"{token} {time.time() + ttl}")
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _soltar(self, clave: str, token: str) -> None:
+        ruta = self._ruta_lock(clave)
+        try:
+            with open(ruta) as f:
+                propio = f.read().split()[:1] == [token]
+            if propio:
+                os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+# ────────────────────────
+# SQLITE
+# ────────────────────────
+
+_SCHEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS cache (
+    clave       TEXT PRIMARY KEY,
+    valor       BLOB NOT NULL,
+    actualizado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bloqueo (
+    clave TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    vence REAL NOT NULL
+);
+"""
+
+
+class BackendSQLite(BackendCache):
+    """
+    Tabla clave/valor; los locks son filas con vencimiento en la misma base.
+    Solo para procesos de un mismo host: el modo WAL usa memoria compartida y no
+    funciona con la base en un disco de red (NFS, SMB).
+    """
+
+    def __init__(self, ruta: str = CACHE_SQLITE):
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self.descripcion = f"sqlite:{os.path.abspath(ruta)}"
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA_SQLITE)
+
+    @contextmanager
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def leer(self, clave: str) -> Optional[bytes]:
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT valor FROM cache WHERE clave = ?", (clave,)).fetchone()
+        return bytes(fila[0]) if fila else None
+
+    def escribir(self, clave: str, valor: bytes) -> None:
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, actualizado) VALUES (?, ?, ?)",
+                (clave, sqlite3.Binary(valor), time.time()),
+            )
+
+    def borrar(self, clave: str) -> None:
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+
+    def existe(self, clave: str) -> bool:
+        with self._conectar() as conn:
+            return conn.execute("SELECT 1 FROM cache WHERE clave = ?", (clave,)).fetchone() is not None
+
+    def listar(self, prefijo: str = "") -> List[Dict[str, Any]]:
+        with self._conectar() as conn:
+            filas = conn.execute(
+                "SELECT clave, length(valor), actualizado FROM cache WHERE substr(clave, 1, ?) = ?",
+                (len(prefijo), prefijo),
+            ).fetchall()
+        return [{"clave": c, "bytes": n, "mtime": datetime.fromtimestamp(t)} for c, n, t in filas]
+
+    def _tomar(self, clave: str, token: str, ttl: float) -> bool:
+        ahora = time.time()
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM bloqueo WHERE clave = ? AND vence < ?", (clave, ahora))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO bloqueo (clave, token, vence) VALUES (?, ?, ?)", (clave, token, ahora + ttl)
+            )
+            return cur.rowcount == 1
+
+    def _renovar(self, clave: str, token: str, ttl: float) -> bool:
+        with self._conectar() as conn:
+            cur = conn.execute(
+                "UPDATE bloqueo SET vence = ? WHERE clave = ? AND token = ?", (time.time() + ttl, clave, token)
+            )
+            return cur.rowcount == 1
+
+    def _soltar(self, clave: str, token: str) -> None:
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM bloqueo WHERE clave = ? AND token = ?", (clave, token))
+
+# ────────────────────────
+# REDIS (Y COMPATIBLES)
+# ────────────────────────
+
+# Comparar el token y actuar en un solo paso del servidor: con GET + DEL/PEXPIRE separados,
+# un lock vencido y tomado por otro nodo entre medio se borraría o extendería
+_LUA_RENOVAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end
+return 0
+"""
+_LUA_SOLTAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
+class BackendRedis(BackendCache):
+    """
+    Claves `<prefijo>dato:<clave>` con el valor, `<prefijo>mtime:<clave>` con la última
+    escritura y `<prefijo>lock:<clave>` para los locks (SET NX con vencimiento).
+    """
+
+    def __init__(self, url: str = CACHE_REDIS_URL, prefijo: str = CACHE_REDIS_PREFIJO, cliente=None):
+        if cliente is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requiere el paquete redis (pip install redis)") from e
+            cliente = redis.Redis.from_url(url)
+            self.descripcion = f"{url} ({prefijo}*)"
+        else:
+            self.descripcion = f"{type(cliente).__name__} ({prefijo}*)"
+        self.r = cliente
+        self.prefijo = prefijo
+
+    def _k(self, tipo: str, clave: str) -> str:
+        return f"{self.prefijo}{tipo}:{clave}"
+
+    def leer(self, clave: str) -> Optional[bytes]:
+        return self.r.get(self._k("dato", clave))
+
+    def escribir(self, clave: str, valor: bytes) -> None:
+        self.r.set(self._k("dato", clave), valor)
+        self.r.set(self._k("mtime", clave), str(time.time()))
+
+    def borrar(self, clave: str) -> None:
+        self.r.delete(self._k("dato", clave), self._k("mtime", clave))
+
+    def existe(self, clave: str) -> bool:
+        return bool(self.r.exists(self._k("dato", clave)))
+
+    def listar(self, prefijo: str = "") -> List[Dict[str, Any]]:
+        base = self._k("dato", "")
+        claves = []
+        for k in self.r.scan_iter(match=f"{base}{prefijo}*"):
+            clave = (k.decode() if isinstance(k, bytes) else k)[len(base):]
+            mtime = self.r.get(self._k("mtime", clave))
+            claves.append({
+                "clave": clave,
+                "bytes": self.r.strlen(k),
+                "mtime": datetime.fromtimestamp(float(mtime or 0)),
+            })
+        return claves
+
+    def _tomar(self, clave: str, token: str, ttl: float) -> bool:
+        return bool(self.r.set(self._k("lock", clave), token, nx=True, px=int(ttl * 1000)))
+
+    def _renovar(self, clave: str, token: str, ttl: float) -> bool:
+        return bool(self.r.eval(_LUA_RENOVAR, 1, self._k("lock", clave), token, int(ttl * 1000)))
+
+    def _soltar(self, clave: str, token: str) -> None:
+        # Solo se borra el lock propio; si ya venció y lo tomó otro nodo, queda intacto
+        self.r.eval(_LUA_SOLTAR, 1, self._k("lock", clave), token)
+
+
+class RedisEnMemoria:
+    """Subconjunto de comandos de Redis que usa BackendRedis, en memoria del proceso."""
+
+    def __init__(self):
+        self._datos: Dict[str, bytes] = {}
+        self._vence: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _vigente(self, k: str) -> bool:
+        vence = self._vence.get(k)
+        if vence is not None and vence <= time.monotonic():
+            self._datos.pop(k, None)
+            self._vence.pop(k, None)
+        return k in self._datos
+
+    def get(self, k: str) -> Optional[bytes]:
+        with self._lock:
+            return self._datos[k] if self._vigente(k) else None
+
+    def set(self, k: str, v, nx: bool = False, px: Optional[int] = None) -> Optional[bool]:
+        with self._lock:
+            if nx and self._vigente(k):
+                return None
+            self._datos[k] = v if isinstance(v, bytes) else str(v).encode()
+            self._vence.pop(k, None)
+            if px:
+                self._vence[k] = time.monotonic() + px / 1000
+            return True
+
+    def eval(self, script: str, numkeys: int, k: str, token: str, *args) -> int:
+        """Solo los scripts de BackendRedis, atómicos como en el servidor."""
+        with self._lock:
+            if not self._vigente(k) or self._datos[k] != token.encode():
+                return 0
+            if script == _LUA_RENOVAR:
+                self._vence[k] = time.monotonic() + int(args[0]) / 1000
+            elif script == _LUA_SOLTAR:
+                self._datos.pop(k, None)
+                self._vence.pop(k, None)
+            else:
+                raise NotImplementedError("script no soportado por RedisEnMemoria")
+            return 1
+
+    def delete(self, *ks: str) -> int:
+        with self._lock:
+            borradas = sum(1 for k in ks if self._vigente(k))
+            for k in ks:
+                self._datos.pop(k, None)
+                self._vence.pop(k, None)
+            return borradas
+
+    def exists(self, *ks: str) -> int:
+        with self._lock:
+            return sum(1 for k in ks if self._vigente(k))
+
+    def strlen(self, k) -> int:
+        k = k.decode() if isinstance(k, bytes) else k
+        with self._lock:
+            return len(self._datos[k]) if self._vigente(k) else 0
+
+    def scan_iter(self, match: str = "*") -> Iterator[bytes]:
+        with self._lock:
+            claves = [k for k in list(self._datos) if self._vigente(k) and fnmatch.fnmatchcase(k, match)]
+        return iter(k.encode() for k in claves)
+
+
+def crear_backend(tipo: str = CACHE_BACKEND) -> BackendCache:
+    if tipo == "archivos":
+        return BackendArchivos()
+    if tipo == "sqlite":
+        return BackendSQLite()
+    if tipo == "redis":
+        return BackendRedis()
+    if tipo == "memoria":
+        return BackendRedis(cliente=RedisEnMemoria())
+    raise ValueError(f"CACHE_BACKEND desconocido: {tipo}. Opciones: archivos, sqlite, redis, memoria")
@@ -1,46 +1,298 @@
 # app/utils/cache_manager.py
+"""
+Caché de time entries por proyecto (clave `time_entries_<id>` en el backend de cache_backend):
+  • Backend configurable (archivos, SQLite, Redis); por defecto `cache/time_entries_<id>.pkl`
+  • Escritura atómica (archivo temporal + rename) para no dejar shards corruptos
+  • Lock por proyecto: varios nodos con la misma caché no descargan dos veces lo mismo
+  • Shards compactos: se guardan los dicts crudos de Redmine, deduplicados por id
+  • Desalojo por antigüedad y tamaño de proyectos inactivos
+  • CLI: python -m app.utils.cache_manager stats | prune | compact
+"""
 
 import os
 import pickle
+import logging
+import argparse
 from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-CACHE_DIR = "cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
+from app.utils.cache_backend import CACHE_DIR, crear_backend
+from app.utils.registros import TimeEntry, paginas
+
+CACHE_PREFIX = "time_entries_"
+CACHE_FORMAT = 2  # 1 = lista de Resource (legado), 2 = dicts crudos compactados
+
+# Límites de desalojo (.env). 0 desactiva el límite.
+CACHE_MAX_AGE_DAYS = int(os.getenv("CACHE_MAX_AGE_DAYS", 90))
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", 0))
+
+# Estado por proyecto para la corrida incremental (huella + acumulados por versión).
+# Pasados PROJECT_STATE_MAX_DAYS desde la última agregación completa se fuerza otra.
+PROJECT_STATE_KEY = "project_state"
+VERSIONES_PREFIX = "versiones_congeladas_"
+PROJECT_STATE_MAX_DAYS = int(os.getenv("PROJECT_STATE_MAX_DAYS", 7))
+
+# Dónde viven shards y estado (CACHE_BACKEND=archivos | sqlite | redis | memoria)
+BACKEND = crear_backend()
+
+# ────────────────────────
+# LECTURA / ESCRITURA DE SHARDS
+# ────────────────────────
+
+def _clave(project_id) -> str:
+    return f"{CACHE_PREFIX}{project_id}"
+
+
+def _dump(obj: Any, clave: str) -> None:
+    BACKEND.escribir(clave, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _load(clave: str) -> Any:
+    """Objeto guardado en `clave`, o None si no existe o está corrupto (en ese caso se borra)."""
+    contenido = BACKEND.leer(clave)
+    if contenido is None:
+        return None
+    try:
+        return pickle.loads(contenido)
+    except (EOFError, pickle.UnpicklingError, AttributeError, IndexError) as exc:
+        logging.warning("⚠️  Caché corrupta %s (%s); se descarta", clave, exc)
+        BACKEND.borrar(clave)
+        return None
+
+
+def _raw(entry) -> Dict[str, Any]:
+    """Dict crudo de un time entry (Resource de redminelib o dict ya compactado)."""
+    return entry if isinstance(entry, dict) else entry.raw()
+
+
+def _compactar(entries: Iterable) -> List[Dict[str, Any]]:
+    """Deduplica por id (gana la última aparición) y ordena por id."""
+    por_id = {}
+    for e in entries:
+        raw = _raw(e)
+        por_id[raw["id"]] = raw
+    return [por_id[k] for k in sorted(por_id)]
+
+
+def _leer_shard(clave: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[datetime]]:
+    """Dicts crudos del shard y cuándo se guardó (None, None si no existe o está corrupto)."""
+    contenido = _load(clave)
+    if contenido is None:
+        return None, None
+    if isinstance(contenido, dict) and contenido.get("format") == CACHE_FORMAT:
+        return contenido["entries"], datetime.fromisoformat(contenido["saved_at"])
+    # Shard legado (lista de Resource): se convierte al vuelo
+    return _compactar(contenido), None
+
+
+def _load_shard(clave: str) -> Optional[List[Dict[str, Any]]]:
+    """Devuelve los dicts crudos del shard o None si no existe o está corrupto."""
+    return _leer_shard(clave)[0]
+
+
+def _save_shard(clave: str, entries: Iterable) -> List[Dict[str, Any]]:
+    compactos = _compactar(entries)
+    _dump({"format": CACHE_FORMAT, "saved_at": datetime.now().isoformat(), "entries": compactos}, clave)
+    return compactos
+
+
+def bloqueo_shard(project_id):
+    """Lock del shard del proyecto en el backend, para escribirlo sin pisar a otra corrida."""
+    return BACKEND.bloqueo(_clave(project_id))
+
+
+def tiene_shard(project_id) -> bool:
+    return BACKEND.existe(_clave(project_id))
+
+# ────────────────────────
+# API PRINCIPAL
+# ────────────────────────
 
 def get_cached_time_entries(redmine, project_id, months: int = 12):
     """
-    Devuelve la lista de time_entries con lógica de actualización parcial:
+    Devuelve los time entries del proyecto (registros TimeEntry) con lógica de actualización parcial:
     ▸ Si existe caché previa: refresca los últimos `months` meses.
-    ▸ Si no existe caché: descarga todo y guarda.
+    ▸ Si no existe caché (o está corrupta): descarga todo y guarda.
+    Con la caché compartida, el proyecto se sincroniza bajo lock: si otro nodo lo
+    guardó mientras se esperaba el lock, se usa ese shard sin volver a pedirlo.
     """
-    cache_file = os.path.join(CACHE_DIR, f"time_entries_{project_id}.pkl")
+    cache_file = _clave(project_id)
+    espera_desde = datetime.now()
+
+    with BACKEND.bloqueo(cache_file):
+        historico, guardado = _leer_shard(cache_file)
+        if historico is not None and guardado is not None and guardado >= espera_desde:
+            logging.info("🔒 Time entries de %s sincronizados por otro nodo; se reutilizan", project_id)
+            return [TimeEntry(raw) for raw in historico]
+        combinados = _sincronizar(redmine, project_id, cache_file, historico, months)
 
-    if os.path.exists(cache_file):
-        # Carga histórica previa
-        with open(cache_file, "rb") as f:
-            historico = pickle.load(f)
-        ids_historicos = {e.id for e in historico}
+    return [TimeEntry(raw) for raw in combinados]
 
+
+def _sincronizar(redmine, project_id, cache_file: str, historico, months: int) -> List[Dict[str, Any]]:
+    if historico is not None:
         # Nuevo período a refrescar
         desde = (datetime.today() - timedelta(days=months*30)).date()
 
-        nuevos = list(redmine.time_entry.filter(project_id=project_id, from_date=desde))
+        nuevos = list(paginas(redmine, "time_entries", project_id=project_id, **{"from": desde.isoformat()}))
 
         # Reemplaza los time_entries nuevos si existen duplicados
-        nuevos_ids = {e.id for e in nuevos}
-        historico_filtrado = [e for e in historico if e.id not in nuevos_ids]
-
-        combinados = historico_filtrado + nuevos
+        nuevos_ids = {e["id"] for e in nuevos}
+        historico_filtrado = [e for e in historico if e["id"] not in nuevos_ids]
 
-        # Actualiza la caché
-        with open(cache_file, "wb") as f:
-            pickle.dump(combinados, f)
-
-        return combinados
+        combinados = _save_shard(cache_file, historico_filtrado + nuevos)
 
     else:
         # Primera ejecución: descarga todo
-        todos = list(redmine.time_entry.filter(project_id=project_id))
-        with open(cache_file, "wb") as f:
-            pickle.dump(todos, f)
-        return todos
+        combinados = _save_shard(cache_file, paginas(redmine, "time_entries", project_id=project_id))
+
+    return combinados
+
+# ────────────────────────
+# ESTADO INCREMENTAL POR PROYECTO
+# ────────────────────────
+
+def load_project_state() -> Dict[Any, Dict[str, Any]]:
+    """Estado guardado por la corrida anterior, sin las entradas vencidas."""
+    estado = _load(PROJECT_STATE_KEY)
+    if estado is None:
+        return {}
+
+    limite = datetime.today().date() - timedelta(days=PROJECT_STATE_MAX_DAYS)
+    return {pid: st for pid, st in estado.items() if st.get("agregado") and st["agregado"] >= limite}
+
+
+def save_project_state(estado: Dict[Any, Dict[str, Any]]) -> None:
+    _dump(estado, PROJECT_STATE_KEY)
+
+# ────────────────────────
+# VERSIONES CERRADAS CONGELADAS
+# ────────────────────────
+
+def load_versiones_congeladas(project_id) -> Dict[Any, Dict[str, Any]]:
+    """Por version_id de las versiones cerradas del proyecto: {"congelada": fecha, "acc": acumulado final}."""
+    return _load(f"{VERSIONES_PREFIX}{project_id}") or {}
+
+
+def save_versiones_congeladas(project_id, versiones: Dict[Any, Dict[str, Any]]) -> None:
+    _dump(versiones, f"{VERSIONES_PREFIX}{project_id}")
+
+# ────────────────────────
+# MANTENIMIENTO: ESTADÍSTICAS, DESALOJO Y COMPACTACIÓN
+# ────────────────────────
+
+def _por_proyecto(prefijo: str) -> List[Dict[str, Any]]:
+    entradas = []
+    for s in BACKEND.listar(prefijo):
+        pid = s["clave"][len(prefijo):]
+        entradas.append({**s, "project_id": int(pid) if pid.isdigit() else pid})
+    return entradas
+
+
+def _shards() -> List[Dict[str, Any]]:
+    return _por_proyecto(CACHE_PREFIX)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Resumen de la caché."""
+    shards = _shards()
+    total = sum(s["bytes"] for s in shards)
+    return {
+        "backend": repr(BACKEND),
+        "shards": len(shards),
+        "bytes": total,
+        "mb": round(total / 1024 / 1024, 2),
+        "mas_antiguo": min((s["mtime"] for s in shards), default=None),
+        "mas_reciente": max((s["mtime"] for s in shards), default=None),
+        "temporales_huerfanos": len(BACKEND.huerfanos()),
+    }
+
+
+def prune_cache(
+    activos: Optional[Set[int]] = None,
+    max_age_days: int = CACHE_MAX_AGE_DAYS,
+    max_mb: float = CACHE_MAX_MB,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Elimina shards y versiones congeladas de proyectos inactivos:
+    ▸ Antigüedad: entradas sin reescribir hace más de `max_age_days` días
+      (si se indica `activos`, solo los de proyectos fuera de ese conjunto).
+    ▸ Tamaño: si el total supera `max_mb`, desaloja los menos recientes,
+      empezando por los inactivos.
+    Devuelve las claves eliminadas y los temporales huérfanos (o lo que se eliminaría con `dry_run`).
+    """
+    shards = sorted(_shards() + _por_proyecto(VERSIONES_PREFIX), key=lambda s: s["mtime"])
+    inactivo = (lambda s: s["project_id"] not in activos) if activos is not None else (lambda s: True)
+    eliminar: List[Dict[str, Any]] = []
+
+    if max_age_days:
+        limite = datetime.now() - timedelta(days=max_age_days)
+        eliminar += [s for s in shards if inactivo(s) and s["mtime"] < limite]
+
+    if max_mb:
+        restantes = [s for s in shards if s not in eliminar]
+        total = sum(s["bytes"] for s in restantes)
+        # Primero inactivos, después el resto; siempre del más viejo al más nuevo
+        for s in sorted(restantes, key=lambda s: (not inactivo(s), s["mtime"])):
+            if total <= max_mb * 1024 * 1024:
+                break
+            eliminar.append(s)
+            total -= s["bytes"]
+
+    claves = [s["clave"] for s in eliminar]
+    huerfanos = BACKEND.huerfanos()
+    if not dry_run:
+        for clave in claves:
+            BACKEND.borrar(clave)
+        for path in huerfanos:
+            BACKEND.borrar_huerfano(path)
+    logging.info("🧹 Caché: %s entradas %s", len(claves) + len(huerfanos), "a eliminar" if dry_run else "eliminadas")
+    return claves + huerfanos
+
+
+def compact_cache() -> int:
+    """Reescribe todos los shards en formato compacto. Devuelve la cantidad procesada."""
+    procesados = 0
+    for s in _shards():
+        entries = _load_shard(s["clave"])
+        if entries is not None:
+            _save_shard(s["clave"], entries)
+            procesados += 1
+    return procesados
+
+# ────────────────────────
+# CLI
+# ────────────────────────
+
+def _activos_redmine() -> Set[int]:
+    from app.utils.redmine_client import get_projects
+    return {p.id for p in get_projects()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.cache_manager", description="Mantenimiento de la caché")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("stats", help="Muestra tamaño y antigüedad de la caché")
+    prune = sub.add_parser("prune", help="Elimina shards de proyectos inactivos")
+    prune.add_argument("--max-age-days", type=int, default=CACHE_MAX_AGE_DAYS)
+    prune.add_argument("--max-mb", type=float, default=CACHE_MAX_MB)
+    prune.add_argument("--activos", action="store_true", help="Consulta Redmine y conserva los proyectos activos")
+    prune.add_argument("--dry-run", action="store_true")
+    sub.add_parser("compact", help="Reescribe los shards en formato compacto")
+    args = parser.parse_args(argv)
+
+    if args.comando == "stats":
+        for k, v in cache_stats().items():
+            print(f"{k:>22}: {v}")
+    elif args.comando == "prune":
+        activos = _activos_redmine() if args.activos else None
+        for path in prune_cache(activos, args.max_age_days, args.max_mb, args.dry_run):
+            print(("[dry-run] " if args.dry_run else "") + path)
+    elif args.comando == "compact":
+        print(f"Shards compactados: {compact_cache()}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,72 @@
+# app/utils/checkpoint.py
+"""
+Checkpoints de corridas del reporte (`cache/checkpoints/<run_id>.ckpt`):
+  • Un registro pickle por proyecto terminado (filas + estado incremental), agregado al final del archivo
+  • Un corte a mitad de escritura deja a lo sumo un registro truncado, que se descarta al leer
+  • El run_id por defecto es la fecha + alcance, así un reintento del mismo día retoma donde quedó
+"""
+
+import os
+import pickle
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.utils.cache_manager import CACHE_DIR
+
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")
+os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+
+def run_id_del_dia(alcance: str = "todos") -> str:
+    """Identificador estable para todas las corridas de hoy con el mismo alcance."""
+    return f"{date.today():%Y%m%d}_{alcance}"
+
+
+def _ruta(run_id: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{run_id}.ckpt")
+
+
+def cargar_checkpoint(run_id: str) -> Dict[Any, Dict[str, Any]]:
+    """Registros por project_id de la corrida `run_id` (vacío si no hay checkpoint)."""
+    path = _ruta(run_id)
+    registros: Dict[Any, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return registros
+
+    with open(path, "rb+") as f:
+        tamano = os.fstat(f.fileno()).st_size
+        while f.tell() < tamano:
+            inicio = f.tell()
+            try:
+                reg = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError, AttributeError, IndexError, ValueError) as exc:
+                # Registro truncado por un corte (EOFError si se cortó en sus primeros bytes):
+                # se recorta para que los próximos appends queden legibles
+                logging.warning("⚠️  Checkpoint %s truncado (%r); se descarta el último registro", run_id, exc)
+                f.truncate(inicio)
+                break
+            registros[reg["project_id"]] = reg
+    return registros
+
+
+def guardar_en_checkpoint(run_id: str, project_id: Any, filas: List[Dict[str, Any]], estado: Optional[Dict[str, Any]]) -> None:
+    with open(_ruta(run_id), "ab") as f:
+        pickle.dump({"project_id": project_id, "filas": filas, "estado": estado}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def cerrar_checkpoint(run_id: str) -> None:
+    """La corrida terminó bien: su checkpoint ya no hace falta."""
+    path = _ruta(run_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def limpiar_checkpoints() -> None:
+    """Elimina checkpoints de días anteriores (sus ventanas de fechas ya no sirven)."""
+    hoy = f"{date.today():%Y%m%d}_"
+    for name in os.listdir(CHECKPOINT_DIR):
+        if name.endswith(".ckpt") and not name.startswith(hoy):
+            os.remove(os.path.join(CHECKPOINT_DIR, name))
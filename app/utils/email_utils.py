@@ -16,6 +16,7 @@ from email.message import EmailMessage
 from typing import List, Sequence, Union, Optional
 
 from app.utils.gestor_mails import get_destinatarios
+from app.utils.file_manager import GMAIL_CLIP_BYTES, tamano_html
 
 # ───────────── Config .env ─────────────
 EMAIL_SENDER   = os.getenv("EMAIL_SENDER")
@@ -90,6 +91,14 @@ def send_html_email(
             except Exception as exc:
                 logging.warning("⚠️  No se pudo adjuntar %s: %s", path, exc)
 
+    # Tamaño del mensaje: Gmail recorta el HTML por encima de ~102 KB
+    html_bytes = tamano_html(html_content)
+    logging.info(
+        "📏 HTML %.1f KB · mensaje %.1f KB", html_bytes / 1024, len(msg.as_bytes()) / 1024
+    )
+    if html_bytes > GMAIL_CLIP_BYTES:
+        logging.warning("⚠️  El HTML supera el límite de recorte de Gmail (%s KB)", GMAIL_CLIP_BYTES // 1024)
+
     ctx = _ssl_context()
     logging.info("📧 Enviando correo a %s…", ", ".join(recip))
 
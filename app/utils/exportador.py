@@ -0,0 +1,85 @@
+# app/utils/exportador.py
+"""
+Exportación del dataset del reporte en streaming:
+  • CSV: se emite de a bloques de filas, la descarga arranca de inmediato
+  • XLSX: openpyxl en modo write-only volcado a un temporal en disco y leído por chunks;
+    el primer byte sale recién con el libro completo (no es streaming real)
+"""
+
+import io
+import csv
+import tempfile
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+from openpyxl import Workbook
+
+from app.utils.file_manager import COLUMNAS_REPORTE
+
+COLUMNAS_EXPORT = ["Equipo"] + COLUMNAS_REPORTE
+FILAS_POR_BLOQUE = 500
+CHUNK_BYTES = 64 * 1024
+
+
+def _ordenadas(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda r: (r.get("Equipo") or "", r.get("Proyecto") or "", r.get("Version") or ""))
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], sep: str = ",") -> Iterator[bytes]:
+    """Genera el CSV (UTF-8 con BOM para Excel) en bloques de FILAS_POR_BLOQUE filas."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=sep)
+
+    buf.write("\ufeff")
+    writer.writerow(COLUMNAS_EXPORT)
+    for n, r in enumerate(_ordenadas(rows), start=1):
+        writer.writerow(["" if r.get(c) is None else r.get(c) for c in COLUMNAS_EXPORT])
+        if n % FILAS_POR_BLOQUE == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _celda(valor):
+    # write-only no acepta tipos fuera de los nativos de Excel
+    if valor is None or isinstance(valor, (int, float, str, date, datetime)):
+        return valor
+    return str(valor)
+
+
+def iter_xlsx(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Genera el XLSX con un Workbook write-only (las filas se escriben a disco a medida
+    que se agregan) y lo devuelve en chunks de CHUNK_BYTES desde un temporal.
+    ▸ Limitación: openpyxl arma el zip en save(), así que no se emite nada hasta tener
+      el libro entero. La memoria queda acotada, pero la latencia al primer byte no;
+      para eso está el CSV, que sí sale a medida que se generan las filas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Reporte")
+    ws.append(COLUMNAS_EXPORT)
+    for r in _ordenadas(rows):
+        ws.append([_celda(r.get(c)) for c in COLUMNAS_EXPORT])
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+GENERADORES = {
+    "csv": iter_csv,
+    "xlsx": iter_xlsx,
+}
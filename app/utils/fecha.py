@@ -1,6 +1,9 @@
 # app/utils/date_utils.py
 
-from datetime import datetime
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
 
 def generar_fecha_reporte() -> str:
     """
@@ -8,3 +11,54 @@ def generar_fecha_reporte() -> str:
     """
     now = datetime.now()
     return f"{now.year}/{now.month:02d}/{now.day:02d} {now.hour:02d}:{now.minute:02d}:{now.second:02d}"
+
+# ────────────────────────
+# VENTANAS DE FECHAS DEL REPORTE
+# ────────────────────────
+# Cada ventana agrega las columnas "Tareas modificadas <nombre>" y "Tareas cerradas <nombre>".
+# REPORTE_VENTANAS (.env, separadas por coma):
+#   semana     → domingo a sábado anterior
+#   <N>d       → últimos N días (30d, 90d…)
+#   mes        → mes en curso
+#   trimestre  → trimestre en curso
+REPORTE_VENTANAS = os.getenv("REPORTE_VENTANAS", "semana,30d")
+
+
+def _claves(claves: str) -> List[str]:
+    return [c.strip().lower() for c in claves.split(",") if c.strip()]
+
+
+def _nombre_ventana(clave: str) -> str:
+    if clave == "semana":
+        return "última semana"
+    if clave == "mes":
+        return "mes en curso"
+    if clave == "trimestre":
+        return "trimestre en curso"
+    m = re.fullmatch(r"(\d+)d", clave)
+    if m:
+        return f"últimos {int(m.group(1))} días"
+    raise ValueError(f"Ventana desconocida en REPORTE_VENTANAS: {clave}. Opciones: semana, <N>d, mes, trimestre")
+
+
+def nombres_ventanas(claves: str = REPORTE_VENTANAS) -> List[str]:
+    """Nombres de las ventanas configuradas, en orden."""
+    return [_nombre_ventana(c) for c in _claves(claves)]
+
+
+def rangos_ventanas(today: datetime, claves: str = REPORTE_VENTANAS) -> Dict[str, Tuple[date, date]]:
+    """Rangos (desde, hasta), ambos inclusive, de cada ventana configurada."""
+    hoy = today.date()
+    rangos = {}
+    for clave in _claves(claves):
+        if clave == "semana":
+            last_saturday = hoy - timedelta(days=(hoy.weekday() - 5) % 7)
+            rango = (last_saturday - timedelta(days=6), last_saturday)
+        elif clave == "mes":
+            rango = (hoy.replace(day=1), hoy)
+        elif clave == "trimestre":
+            rango = (hoy.replace(month=(hoy.month - 1) // 3 * 3 + 1, day=1), hoy)
+        else:
+            rango = (hoy - timedelta(days=int(clave[:-1])), hoy)
+        rangos[_nombre_ventana(clave)] = rango
+    return rangos
@@ -1,133 +1,313 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
 import pandas as pd
 import re
-from app.utils.fecha import generar_fecha_reporte
+import zlib
+import logging
+from app.utils.fecha import generar_fecha_reporte, nombres_ventanas
 
-def data_to_html(rows: List[Dict[str, Any]]) -> str:
+# Columnas alineadas a la izquierda (el resto va centrado)
+COLUMNAS_IZQUIERDA = ("Proyecto", "Version")
+
+# Columnas por ventana de fechas (REPORTE_VENTANAS en el .env)
+COLUMNAS_VENTANAS = [
+    col for v in nombres_ventanas() for col in (f"Tareas modificadas {v}", f"Tareas cerradas {v}")
+]
+
+# Anchos de columna
+ANCHOS = {
+    "Proyecto": "150px", "Version": "180px", "Fecha de inicio": "90px",
+    "Fecha finalización": "90px", "Tareas totales": "70px", "Tareas abiertas": "70px",
+    **{col: "70px" for col in COLUMNAS_VENTANAS},
+    "Horas estimadas": "90px", "Horas insumidas": "90px",
+    "Progreso tareas": "90px", "Horas consumidas": "90px"
+}
+
+# Límite a partir del cual Gmail recorta el mensaje ("[Mensaje recortado]")
+GMAIL_CLIP_BYTES = 102 * 1024
+
+# Columnas del reporte en el orden en que se muestran/exportan
+COLUMNAS_REPORTE = [
+    "Proyecto", "Version", "Fecha de inicio", "Fecha finalización",
+    "Tareas abiertas", "Tareas totales", "Progreso tareas", 
+    *COLUMNAS_VENTANAS,
+    "Horas estimadas", "Horas insumidas", "Horas consumidas"
+]
+
+def _formatear_celda(col: str, valor: Any, span: str) -> Any:
     """
-    Genera el HTML del reporte de proyectos con corte por VERSION,
-    alineando a la izquierda las columnas Proyecto y Version.
+    Texto de una celda: horas con 2 decimales, porcentajes sin decimales y
+    Proyecto/Version partidos en el primer guion (la segunda parte va en `span`).
     """
-    if not rows:
-        return "<p>No se encontraron proyectos relevantes.</p>"
+    cell = valor if valor is not None else ""
 
-    df = pd.DataFrame(rows)
-    if "Equipo" not in df.columns:
-        return "<p>Error: Falta la columna 'Equipo'.</p>"
+    # Formateos puntuales
+    if col in ("Horas estimadas", "Horas insumidas") and isinstance(cell, (int, float)):
+        cell = f"{cell:.2f}"
+    elif col in ("Progreso tareas", "Horas consumidas") and isinstance(cell, str) and "%" in cell:
+        cell = cell.split(".")[0] + "%"
+
+    # Separador Proyecto/Version con salto de línea
+    if col in COLUMNAS_IZQUIERDA and isinstance(cell, str):
+        m = re.search(r"\s*[-–—]\s*", cell)
+        if m:
+            idx = m.start()
+            parte1 = cell[:idx].strip()
+            parte2 = cell[idx + len(m.group()):].strip()
+            cell = f"{parte1}<br>" + span.format(parte2)
 
-    columnas_ordenadas = [
-        "Proyecto", "Version", "Fecha de inicio", "Fecha finalización",
-        "Tareas abiertas", "Tareas totales", "Progreso tareas", 
-        "Tareas modificadas última semana", "Tareas cerradas última semana",
-        "Tareas modificadas últimos 30 días", "Tareas cerradas últimos 30 días",
-        "Horas estimadas", "Horas insumidas", "Horas consumidas"
-    ]
+    return cell
 
+def _inicio_html() -> str:
+    """Encabezado del reporte con estilos inline (se cierra con _FIN_HTML)."""
     fecha_reporte = generar_fecha_reporte()
-    html = f"""
+    return f"""
     <div style='font-family: Arial, sans-serif; font-size: 13px;'>
     <h2 style='margin-bottom: 8px;'>
         KZN - Reporte de Avance: Proyectos y Versiones al {fecha_reporte}
     </h2>
     """
 
-    # Anchos de columna (opcional)
-    anchos = {
-    "Proyecto": "150px", "Version": "180px", "Fecha de inicio": "90px",
-    "Fecha finalización": "90px", "Tareas totales": "70px", "Tareas abiertas": "70px",
-    "Tareas modificadas última semana": "70px", "Tareas cerradas última semana": "70px",
-    "Tareas modificadas últimos 30 días": "70px", "Tareas cerradas últimos 30 días": "70px",
-    "Horas estimadas": "90px", "Horas insumidas": "90px",
-    "Progreso tareas": "90px", "Horas consumidas": "90px"
-    }
+_FIN_HTML = "</div>"
 
-    for equipo, grupo in df.groupby("Equipo"):
-        grupo = grupo.drop(columns=["Equipo"])[columnas_ordenadas]
+def _tabla_equipo_html(equipo: str, grupo: pd.DataFrame) -> str:
+    """Título y tabla de un equipo con estilos inline."""
+    columnas_ordenadas = COLUMNAS_REPORTE
+    anchos = ANCHOS
+    grupo = grupo.drop(columns=["Equipo"])[columnas_ordenadas]
 
-        html += f"<h3 style='margin-top: 20px; margin-bottom: 6px; font-size: 14px;'>{equipo}</h3>"
-        html += """
+    html = f"<h3 style='margin-top: 20px; margin-bottom: 6px; font-size: 14px;'>{equipo}</h3>"
+    html += """
         <table style='border-collapse: collapse; width: 100%; table-layout: fixed;'>
         <thead><tr>
         """
-        # Encabezados
+    # Encabezados
+    for col in columnas_ordenadas:
+        # Si es Proyecto o Version alineamos a la izquierda
+        align = "left" if col in COLUMNAS_IZQUIERDA else "center"
+        html += (
+        f"<th style='border: 1px solid #ccc; padding: 4px;"
+        f"background-color: #f2f2f2; text-align: {align};"
+        f"vertical-align: middle; width: {anchos[col]};'>{col}</th>"
+        )
+    html += "</tr></thead><tbody>"
+    # Línea gruesa debajo del header
+    html += (
+    f"<tr><td colspan='{len(COLUMNAS_REPORTE)}' style='border: none;"
+    "border-bottom: 3px solid #333; padding: 0; height: 1px;'></td></tr>"
+    )
+
+    # Orden y sort
+    grupo['orden_version'] = grupo.apply(lambda row: (
+        0 if row["Version"] == "Sin versión"
+        else 1 if row["Fecha de inicio"] is not None
+        else 2
+    ), axis=1)
+    grupo['fecha_sort'] = grupo.apply(lambda row: (
+        "" if row["Version"] == "Sin versión"
+        else row["Fecha de inicio"] if row["Fecha de inicio"] is not None
+        else "9999-12-31"
+    ), axis=1)
+    grupo_sorted = grupo.sort_values(['Proyecto', 'orden_version', 'fecha_sort'])
+    grupo_sorted = grupo_sorted.drop(['orden_version', 'fecha_sort'], axis=1)
+
+    # Filas
+    proyecto_actual = None
+    for _, row in grupo_sorted.iterrows():
+        if proyecto_actual and proyecto_actual != row["Proyecto"]:
+            # Línea gruesa entre proyectos
+            html += (
+            f"<tr><td colspan='{len(COLUMNAS_REPORTE)}' style='border: none;"
+            "border-bottom: 3px solid #333; padding: 0; height: 1px;'></td></tr>"
+            )
+        proyecto_actual = row["Proyecto"]
+
+        html += "<tr>"
         for col in columnas_ordenadas:
-            # Si es Proyecto o Version alineamos a la izquierda
-            align = "left" if col in ("Proyecto", "Version") else "center"
+            cell = _formatear_celda(
+                col, row[col], "<span style='font-size:12px;color:#555;'>{}</span>"
+            )
+
+            # Determinar alineación según columna
+            align = "left" if col in COLUMNAS_IZQUIERDA else "center"
             html += (
-            f"<th style='border: 1px solid #ccc; padding: 4px;"
-            f"background-color: #f2f2f2; text-align: {align};"
-            f"vertical-align: middle; width: {anchos[col]};'>{col}</th>"
+            f"<td style='border: 1px solid #ccc; padding: 2px 4px;"
+            f"text-align: {align}; vertical-align: middle;"
+            "white-space: normal; overflow-wrap: break-word;'>"
+            f"{cell}</td>"
             )
-        html += "</tr></thead><tbody>"
-        # Línea gruesa debajo del header
-        html += (
-        "<tr><td colspan='14' style='border: none;"
-        "border-bottom: 3px solid #333; padding: 0; height: 1px;'></td></tr>"
+        html += "</tr>"
+
+    # Línea gruesa al final del equipo
+    html += (
+    f"<tr><td colspan='{len(COLUMNAS_REPORTE)}' style='border: none;"
+    "border-bottom: 3px solid #333; padding: 0; height: 1px;'></td></tr>"
+    )
+    html += "</tbody></table>"
+
+    return html
+
+def data_to_html(rows: List[Dict[str, Any]], compacto: bool = False) -> str:
+    """
+    Genera el HTML del reporte de proyectos con corte por VERSION,
+    alineando a la izquierda las columnas Proyecto y Version.
+    Con `compacto` usa un bloque <style> con clases cortas (ver _html_compacto).
+    """
+    if not rows:
+        return "<p>No se encontraron proyectos relevantes.</p>"
+
+    if compacto:
+        return _html_compacto(rows)
+
+    df = pd.DataFrame(rows)
+    if "Equipo" not in df.columns:
+        return "<p>Error: Falta la columna 'Equipo'.</p>"
+
+    html = _inicio_html()
+    for equipo, grupo in df.groupby("Equipo"):
+        html += _tabla_equipo_html(equipo, grupo)
+    html += _FIN_HTML
+    return html
+
+def iter_html_por_equipo(grupos: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> Iterator[str]:
+    """
+    Versión progresiva de data_to_html: emite el encabezado enseguida y después la
+    tabla de cada equipo a medida que llegan sus filas (`grupos` = pares equipo, filas).
+    """
+    yield _inicio_html()
+    vacio = True
+    for equipo, filas in grupos:
+        vacio = False
+        yield _tabla_equipo_html(equipo, pd.DataFrame(filas))
+    if vacio:
+        yield "<p>No se encontraron proyectos relevantes.</p>"
+    yield _FIN_HTML
+
+def gzip_progresivo(partes: Iterable[str]) -> Iterator[bytes]:
+    """
+    Comprime en gzip un flujo de texto sin retenerlo: cada parte se vacía con
+    Z_SYNC_FLUSH para que el navegador pueda mostrarla apenas llega.
+    """
+    comp = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for parte in partes:
+        yield comp.compress(parte.encode("utf-8")) + comp.flush(zlib.Z_SYNC_FLUSH)
+    yield comp.flush()
+
+
+# ──────────────── Modo compacto (emails) ────────────────
+# Un solo bloque <style> (Gmail lo respeta en <head>) y clases de una letra en lugar
+# de estilos inline por celda; los separadores entre proyectos pasan a ser un borde
+# superior de la primera fila del proyecto en vez de filas extra.
+_ESTILO_COMPACTO = (
+    ".r{font-family:Arial,sans-serif;font-size:13px}"
+    ".r h2{margin-bottom:8px}"
+    ".r h3{margin:20px 0 6px;font-size:14px}"
+    ".r table{border-collapse:collapse;width:100%;table-layout:fixed;border-bottom:3px solid #333}"
+    ".r th,.r td{border:1px solid #ccc;text-align:center;vertical-align:middle}"
+    ".r th{padding:4px;background-color:#f2f2f2;border-bottom:3px solid #333}"
+    ".r td{padding:2px 4px;white-space:normal;overflow-wrap:break-word}"
+    ".r .l{text-align:left}"
+    ".r tr.n td{border-top:3px solid #333}"
+    ".r .s{font-size:12px;color:#555}"
+)
+
+def _ordenar_versiones(grupo: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mismo orden que el modo normal: Proyecto, "Sin versión" primero y luego por fecha de inicio."""
+    def clave(r):
+        if r["Version"] == "Sin versión":
+            return (r["Proyecto"] or "", 0, "")
+        if r["Fecha de inicio"] is not None:
+            return (r["Proyecto"] or "", 1, str(r["Fecha de inicio"]))
+        return (r["Proyecto"] or "", 2, "9999-12-31")
+    return sorted(grupo, key=clave)
+
+def _tabla_compacta(grupo: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Bloques (proyecto, html de sus filas) de un equipo, en orden de aparición."""
+    bloques: List[Any] = []
+    for r in _ordenar_versiones(grupo):
+        celdas = "".join(
+            ("<td class=l>" if col in COLUMNAS_IZQUIERDA else "<td>")
+            + str(_formatear_celda(col, r.get(col), "<span class=s>{}</span>")) + "</td>"
+            for col in COLUMNAS_REPORTE
         )
+        if bloques and bloques[-1][0] == r["Proyecto"]:
+            bloques[-1][1].append(f"<tr>{celdas}</tr>")
+        else:
+            clase = " class=n" if bloques else ""
+            bloques.append((r["Proyecto"], [f"<tr{clase}>{celdas}</tr>"]))
+    return [(p, "".join(filas)) for p, filas in bloques]
 
-        # Orden y sort
-        grupo['orden_version'] = grupo.apply(lambda row: (
-            0 if row["Version"] == "Sin versión"
-            else 1 if row["Fecha de inicio"] is not None
-            else 2
-        ), axis=1)
-        grupo['fecha_sort'] = grupo.apply(lambda row: (
-            "" if row["Version"] == "Sin versión"
-            else row["Fecha de inicio"] if row["Fecha de inicio"] is not None
-            else "9999-12-31"
-        ), axis=1)
-        grupo_sorted = grupo.sort_values(['Proyecto', 'orden_version', 'fecha_sort'])
-        grupo_sorted = grupo_sorted.drop(['orden_version', 'fecha_sort'], axis=1)
-
-        # Filas
-        proyecto_actual = None
-        for _, row in grupo_sorted.iterrows():
-            if proyecto_actual and proyecto_actual != row["Proyecto"]:
-                # Línea gruesa entre proyectos
-                html += (
-                "<tr><td colspan='14' style='border: none;"
-                "border-bottom: 3px solid #333; padding: 0; height: 1px;'></td></tr>"
-                )
-            proyecto_actual = row["Proyecto"]
-
-            html += "<tr>"
-            for col in columnas_ordenadas:
-                cell = row[col] if row[col] is not None else ""
-
-                # Formateos puntuales
-                if col in ("Horas estimadas", "Horas insumidas") and isinstance(cell, (int, float)):
-                    cell = f"{cell:.2f}"
-                elif col in ("Progreso tareas", "Horas consumidas") and isinstance(cell, str) and "%" in cell:
-                    cell = cell.split(".")[0] + "%"
-
-                # Separador Proyecto/Version con salto de línea
-                if col in ("Proyecto", "Version") and isinstance(cell, str):
-                    m = re.search(r"\s*[-–—]\s*", cell)
-                    if m:
-                        idx = m.start()
-                        parte1 = cell[:idx].strip()
-                        parte2 = cell[idx + len(m.group()):].strip()
-                        cell = (
-                        f"{parte1}<br>"
-                        f"<span style='font-size:12px;color:#555;'>{parte2}</span>"
-                        )
-
-                # Determinar alineación según columna
-                align = "left" if col in ("Proyecto", "Version") else "center"
-                html += (
-                f"<td style='border: 1px solid #ccc; padding: 2px 4px;"
-                f"text-align: {align}; vertical-align: middle;"
-                "white-space: normal; overflow-wrap: break-word;'>"
-                f"{cell}</td>"
+def _encabezado_compacto(equipo: str) -> str:
+    cols = "".join(f"<col width={ANCHOS[c][:-2]}>" for c in COLUMNAS_REPORTE)
+    ths = "".join(
+        (f"<th class=l>{c}</th>" if c in COLUMNAS_IZQUIERDA else f"<th>{c}</th>") for c in COLUMNAS_REPORTE
+    )
+    return f"<h3>{equipo}</h3><table><colgroup>{cols}</colgroup><thead><tr>{ths}</tr></thead><tbody>"
+
+def _documento_compacto(cuerpo: str) -> str:
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=utf-8><style>{_ESTILO_COMPACTO}</style></head>"
+        f"<body><div class=r><h2>KZN - Reporte de Avance: Proyectos y Versiones al {generar_fecha_reporte()}</h2>"
+        f"{cuerpo}</div></body></html>"
+    )
+
+def _por_equipo(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    equipos: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        equipos.setdefault(r.get("Equipo"), []).append(r)
+    return {eq: equipos[eq] for eq in sorted(equipos)}
+
+def _html_compacto(rows: List[Dict[str, Any]]) -> str:
+    cuerpo = "".join(
+        _encabezado_compacto(eq) + "".join(h for _, h in _tabla_compacta(grupo)) + "</tbody></table>"
+        for eq, grupo in _por_equipo(rows).items()
+    )
+    return _documento_compacto(cuerpo)
+
+def data_to_html_partes(rows: List[Dict[str, Any]], max_bytes: int = GMAIL_CLIP_BYTES) -> List[str]:
+    """
+    HTML compacto partido en varios documentos de hasta `max_bytes` cada uno,
+    cortando siempre entre proyectos (un proyecto nunca queda repartido).
+    Un proyecto que solo ya supera `max_bytes` va en su propia parte, con un aviso.
+    """
+    if not rows:
+        return [data_to_html(rows)]
+
+    base = len(_documento_compacto("").encode("utf-8"))
+    partes: List[str] = []
+    cuerpo, tamano = "", base
+
+    for eq, grupo in _por_equipo(rows).items():
+        encabezado = _encabezado_compacto(eq)
+        cierre = "</tbody></table>"
+        extra_tabla = len((encabezado + cierre).encode("utf-8"))
+        tabla_abierta = False
+
+        for proyecto, filas in _tabla_compacta(grupo):
+            peso = len(filas.encode("utf-8"))
+            necesario = peso + (0 if tabla_abierta else extra_tabla)
+            if tabla_abierta or cuerpo:
+                if tamano + necesario > max_bytes:
+                    partes.append(_documento_compacto(cuerpo + (cierre if tabla_abierta else "")))
+                    cuerpo, tamano, tabla_abierta = "", base, False
+                    necesario = peso + extra_tabla
+            if not cuerpo and base + necesario > max_bytes:
+                logging.warning(
+                    "⚠️  El proyecto %s de %s ocupa %.1f KB: su parte supera el límite de %.1f KB",
+                    proyecto, eq, peso / 1024, max_bytes / 1024,
                 )
-            html += "</tr>"
+            if not tabla_abierta:
+                cuerpo += encabezado
+                tabla_abierta = True
+            cuerpo += filas
+            tamano += necesario
 
-        # Línea gruesa al final del equipo
-        html += (
-        "<tr><td colspan='14' style='border: none;"
-        "border-bottom: 3px solid #333; padding: 0; height: 1px;'></td></tr>"
-        )
-        html += "</tbody></table>"
+        if tabla_abierta:
+            cuerpo += cierre
 
-    html += "</div>"
-    return html
+    if cuerpo:
+        partes.append(_documento_compacto(cuerpo))
+    return partes
+
+def tamano_html(html: str) -> int:
+    """Tamaño en bytes (UTF-8) del HTML tal como viaja en el mail."""
+    return len(html.encode("utf-8"))
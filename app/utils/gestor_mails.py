@@ -1,9 +1,10 @@
 import os
 import re
+import time
 from collections import defaultdict
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
-from redminelib import Redmine
+from app.utils.redmine_governor import crear_redmine
 
 # ────────────────────────────────────────────────
 # Cargar variables de entorno
@@ -12,11 +13,12 @@ load_dotenv()
 REDMINE_URL = os.getenv("REDMINE_URL")
 API_KEY = os.getenv("REDMINE_API_KEY")
 MAIL_DOMAIN = os.getenv("MAIL_DOMAIN", "@kaizen2b.com")
+GRUPOS_TTL = int(os.getenv("GRUPOS_TTL", 600))  # segundos que se reutilizan los miembros de un grupo
 
 if not REDMINE_URL or not API_KEY:
     raise RuntimeError("Faltan REDMINE_URL o API_KEY en el .env")
 
-redmine = Redmine(REDMINE_URL.rstrip("/"), key=API_KEY)
+redmine = crear_redmine(REDMINE_URL, API_KEY)
 
 # ────────────────────────────────────────────────
 # Helpers
@@ -26,6 +28,20 @@ def _slug(txt: str) -> str:
     txt = txt.lower().replace("kzn", "")
     return "_".join(txt.split())
 
+# Miembros por grupo: un único listado paginado (/users.json?group_id=) en vez de
+# un group.get + un user.get por usuario. Se cachea para que los N equipos de una
+# corrida no repitan la consulta.
+_logins_cache: Dict[int, Tuple[float, List[str]]] = {}
+
+def _logins_grupo(gid: int) -> List[str]:
+    ahora = time.monotonic()
+    cacheado = _logins_cache.get(gid)
+    if cacheado and ahora - cacheado[0] < GRUPOS_TTL:
+        return cacheado[1]
+    logins = [u.login for u in redmine.user.filter(group_id=gid)]
+    _logins_cache[gid] = (ahora, logins)
+    return logins
+
 # ────────────────────────────────────────────────
 # Construcción del diccionario de alias → mails
 # ────────────────────────────────────────────────
@@ -44,13 +60,7 @@ def construir_diccionario_equipos() -> Dict[str, List[str]]:
     for alias, group_ids in ALIAS_TO_GROUP_IDS.items():
         for gid in group_ids:
             try:
-                grupo = redmine.group.get(gid, include="users")
-                for u in grupo.users:
-                    try:
-                        full_user = redmine.user.get(u.id)
-                        alias_map[alias].append(f"{full_user.login}{MAIL_DOMAIN}")
-                    except Exception as ue:
-                        print(f"❌ No se pudo acceder al usuario {u.id} del grupo {alias}: {ue}")
+                alias_map[alias].extend(f"{login}{MAIL_DOMAIN}" for login in _logins_grupo(gid))
             except Exception as e:
                 print(f"❌ Error al obtener grupo {gid} (alias {alias}): {e}")
 
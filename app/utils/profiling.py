@@ -0,0 +1,54 @@
+# app/utils/profiling.py
+"""
+Perfilado opcional de corridas del reporte:
+  • cProfile alrededor del bloque (determinístico)
+  • Volcado pstats en logs/ (abrible con snakeviz, pstats, etc.) + resumen de texto
+  • Log de las funciones más costosas
+"""
+
+import io
+import os
+import pstats
+import cProfile
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator
+
+# ───────────── Config .env ─────────────
+REPORT_PROFILE     = os.getenv("REPORT_PROFILE", "false").lower() == "true"
+REPORT_PROFILE_TOP = int(os.getenv("REPORT_PROFILE_TOP", 25))
+LOGS_DIR           = os.getenv("LOGS_DIR", "logs")
+
+
+@contextmanager
+def perfilar(nombre: str = "generate_report", activo: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Perfila el bloque si `activo`. El dict devuelto se completa al salir con
+    `archivo` (ruta .pstats) y `resumen` (top de funciones por tiempo acumulado).
+    """
+    resultado: Dict[str, Any] = {}
+    if not activo:
+        yield resultado
+        return
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield resultado
+    finally:
+        prof.disable()
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        base = os.path.join(LOGS_DIR, f"perfil_{nombre}_{datetime.now():%Y%m%d_%H%M%S}")
+        prof.dump_stats(base + ".pstats")
+
+        buf = io.StringIO()
+        stats = pstats.Stats(prof, stream=buf).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(REPORT_PROFILE_TOP)
+        stats.sort_stats("tottime").print_stats(REPORT_PROFILE_TOP)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+
+        resultado["archivo"] = base + ".pstats"
+        resultado["resumen"] = buf.getvalue()
+        logging.info("🔬 Perfil guardado en %s\n%s", resultado["archivo"], resultado["resumen"])
@@ -0,0 +1,316 @@
+# app/utils/redmine_cassette.py
+"""
+Grabación y reproducción del tráfico con Redmine, para medir cambios de rendimiento
+contra datos con la forma de producción sin red:
+  • grabar:     cada request (y su respuesta o error de redminelib) se agrega a un cassette
+                que se escribe anonimizado al terminar el proceso
+  • reproducir: el cliente responde desde el cassette, con latencia opcional
+                (fija o la grabada), pasando igual por el regulador de Redmine;
+                caché, checkpoints y snapshots van a un directorio temporal
+  • CLI: python -m app.utils.redmine_cassette resumen [archivo]
+
+Se elige con REDMINE_CASSETTE_MODO y crear_redmine arma el engine que corresponda.
+"""
+
+import os
+import re
+import gzip
+import copy
+import json
+import time
+import atexit
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from redminelib import exceptions
+
+from app.utils.redmine_governor import MotorGobernado
+
+# ───────────── Config .env ─────────────
+REDMINE_CASSETTE_MODO      = os.getenv("REDMINE_CASSETTE_MODO", "").lower()   # "" | grabar | reproducir
+REDMINE_CASSETTE           = os.getenv("REDMINE_CASSETTE", os.path.join("cassettes", "redmine.json.gz"))
+REDMINE_CASSETTE_LATENCIA  = os.getenv("REDMINE_CASSETTE_LATENCIA", "0")       # segundos por request | grabada
+
+CASSETTE_FORMATO = 1
+_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+class RequestNoGrabada(Exception):
+    """La corrida reproducida pidió algo que no está en el cassette."""
+
+
+def clave_request(method: str, url: str, params: Optional[Dict[str, Any]]) -> str:
+    """
+    `GET /issues.json?limit=100&project_id=12`: ruta sin host y parámetros ordenados.
+    Las fechas se normalizan para que un cassette se pueda reproducir otro día
+    (p. ej. el from_date de la actualización de time entries).
+    """
+    normalizados = sorted((k, "<fecha>" if _FECHA.match(str(v)) else str(v)) for k, v in (params or {}).items())
+    consulta = f"?{urlencode(normalizados)}" if normalizados else ""
+    return f"{method.upper()} {urlsplit(url).path}{consulta}"
+
+# ────────────────────────
+# ANONIMIZACIÓN
+# ────────────────────────
+
+# Texto libre o datos personales; el resto (ids, fechas, horas, estados) se conserva
+_CLAVES_SENSIBLES = {
+    "name", "subject", "description", "notes", "comments", "login", "firstname", "lastname",
+    "mail", "identifier", "homepage", "value", "filename", "title", "text",
+}
+# Contenedores cuyo `name` es un catálogo de Redmine, no un dato del cliente
+_CATALOGOS = {"status", "tracker", "priority", "activity", "custom_fields", "role", "roles", "issue_statuses", "trackers"}
+
+
+def _raices(requests_: Dict[str, List[Dict[str, Any]]]) -> set:
+    """Nombres de los proyectos sin padre: son los equipos y el reporte los necesita tal cual."""
+    nombres = set()
+    for entradas in requests_.values():
+        for e in entradas:
+            respuesta = e.get("respuesta")
+            if not isinstance(respuesta, dict):
+                continue
+            proyectos = respuesta.get("projects") or ([respuesta["project"]] if "project" in respuesta else [])
+            nombres.update(p["name"] for p in proyectos if isinstance(p, dict) and "parent" not in p and "name" in p)
+    return nombres
+
+
+def anonimizador(sal: str, conservar: set) -> Callable[[Any], Any]:
+    """Reemplaza los textos sensibles por seudónimos estables (mismo texto → mismo seudónimo)."""
+
+    def seudonimo(clave: str, valor: str) -> str:
+        if valor in conservar or not valor:
+            return valor
+        h = hashlib.sha256(f"{sal}{valor}".encode()).hexdigest()[:10]
+        return f"{h}@anonimo.invalid" if clave == "mail" else f"{clave}-{h}"
+
+    def recorrer(obj, contenedor=""):
+        if isinstance(obj, list):
+            return [recorrer(x, contenedor) for x in obj]
+        if not isinstance(obj, dict):
+            return obj
+        limpio = {}
+        for k, v in obj.items():
+            if isinstance(v, str) and k in _CLAVES_SENSIBLES and not (k == "name" and contenedor in _CATALOGOS):
+                limpio[k] = seudonimo(k, v)
+            else:
+                limpio[k] = recorrer(v, k)
+        return limpio
+
+    return recorrer
+
+# ────────────────────────
+# CASSETTE
+# ────────────────────────
+
+class Cassette:
+    """Respuestas por clave de request, en el orden en que llegaron."""
+
+    def __init__(self, requests_: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.requests: Dict[str, List[Dict[str, Any]]] = defaultdict(list, requests_ or {})
+        self._servidas: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def agregar(self, clave: str, entrada: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests[clave].append(entrada)
+
+    def siguiente(self, clave: str) -> Dict[str, Any]:
+        """Próxima respuesta grabada para `clave`; la última se repite si se pide de más."""
+        with self._lock:
+            entradas = self.requests.get(clave)
+            if not entradas:
+                raise RequestNoGrabada(f"{clave} no está en el cassette; grabalo de nuevo con la misma caché y configuración")
+            i = self._servidas[clave]
+            self._servidas[clave] += 1
+            return entradas[min(i, len(entradas) - 1)]
+
+    def guardar(self, path: str, anonimizar: bool = True) -> None:
+        with self._lock:
+            requests_ = {k: list(v) for k, v in self.requests.items()}
+        if anonimizar:
+            # Sal aleatoria y descartada: los seudónimos no se pueden revertir
+            limpiar = anonimizador(os.urandom(16).hex(), _raices(requests_))
+            requests_ = {k: [limpiar(e) for e in v] for k, v in requests_.items()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"formato": CASSETTE_FORMATO, "grabado": datetime.now().isoformat(), "requests": requests_}, f)
+        os.replace(tmp, path)
+        logging.info("📼 Cassette guardado en %s: %s requests", path, sum(len(v) for v in requests_.values()))
+
+    @classmethod
+    def cargar(cls, path: str) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            contenido = json.load(f)
+        if contenido.get("formato") != CASSETTE_FORMATO:
+            raise ValueError(f"Cassette {path} con formato desconocido: {contenido.get('formato')}")
+        return cls(contenido["requests"])
+
+# ────────────────────────
+# ENGINES
+# ────────────────────────
+
+class Grabador:
+    """
+    Mixin de engine: agrega al cassette `grabacion` cada request con su respuesta
+    (o el error de redminelib) y la latencia HTTP.
+    """
+
+    grabacion: Cassette
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._reloj = threading.local()
+        # Se cronometra solo la request HTTP, sin las esperas del regulador
+        if getattr(self, "session", None) is not None:
+            enviar = self.session.request
+
+            def cronometrado(*args, **kwargs):
+                inicio = time.monotonic()
+                try:
+                    return enviar(*args, **kwargs)
+                finally:
+                    self._reloj.latencia = time.monotonic() - inicio
+
+            self.session.request = cronometrado
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        self._reloj.latencia = None
+        inicio = time.monotonic()
+        entrada: Dict[str, Any] = {}
+        try:
+            respuesta = super().request(method, url, headers=headers, params=params, data=data)
+            # Copia: redminelib extiende la lista de la primera página con las siguientes
+            entrada["respuesta"] = copy.deepcopy(respuesta)
+            return respuesta
+        except exceptions.BaseRedmineError as exc:
+            entrada.update(error=type(exc).__name__, mensaje=str(exc))
+            raise
+        finally:
+            if entrada:
+                latencia = self._reloj.latencia if self._reloj.latencia is not None else time.monotonic() - inicio
+                entrada["latencia"] = round(latencia, 4)
+                self.grabacion.agregar(clave_request(method, url, params), entrada)
+
+
+def _latencia_fija(valor: str) -> Optional[float]:
+    return None if valor == "grabada" else float(valor)
+
+
+class Reproductor(MotorGobernado):
+    """
+    Engine que responde desde el cassette `cinta`. Pasa por el regulador, así la
+    concurrencia y el tope de RPS se comportan como contra el servidor real.
+    """
+
+    cinta: Cassette
+    latencia: Optional[float] = 0.0  # None = la grabada
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        clave = clave_request(method, url, params)
+
+        def _servir():
+            entrada = self.cinta.siguiente(clave)
+            espera = entrada.get("latencia", 0.0) if self.latencia is None else self.latencia
+            if espera:
+                time.sleep(espera)
+            return entrada
+
+        entrada = self.gobernador.ejecutar(_servir, lectura=method.lower() == "get", descripcion=f"{method.upper()} {url}")
+        if "error" in entrada:
+            # Sin pasar por el __init__ propio de cada excepción (algunas esperan la respuesta HTTP)
+            exc = getattr(exceptions, entrada["error"], exceptions.UnknownError)
+            error = exc.__new__(exc)
+            Exception.__init__(error, entrada.get("mensaje", ""))
+            raise error
+        return copy.deepcopy(entrada["respuesta"])
+
+# ────────────────────────
+# ELECCIÓN DEL ENGINE
+# ────────────────────────
+
+# Una sola grabación por proceso: todos los clientes (reportes, mails) van al mismo cassette
+GRABACION = Cassette()
+_guardado_registrado = False
+_reproduccion_aislada = False
+
+
+def guardar_cassette(path: str = REDMINE_CASSETTE) -> None:
+    GRABACION.guardar(path)
+
+
+def aislar_reproduccion() -> None:
+    """
+    Lleva caché, checkpoints y snapshots de la corrida reproducida a un directorio
+    temporal: los datos anonimizados no deben mezclarse con el histórico real
+    (/api/tendencias) ni con el estado incremental. Lo que se configuró
+    explícitamente (SNAPSHOT_DB, CACHE_DIR / CACHE_BACKEND) se respeta.
+    """
+    global _reproduccion_aislada
+    if _reproduccion_aislada:
+        return
+    from app.utils import cache_manager, checkpoint, snapshot_store
+    from app.utils.cache_backend import BackendArchivos
+
+    destino = tempfile.mkdtemp(prefix="reproduccion_")
+    if "SNAPSHOT_DB" not in os.environ:
+        snapshot_store.SNAPSHOT_DB = os.path.join(destino, "snapshots.sqlite3")
+    if "CACHE_DIR" not in os.environ and "CACHE_BACKEND" not in os.environ:
+        cache_manager.BACKEND = BackendArchivos(os.path.join(destino, "cache"))
+        checkpoint.CHECKPOINT_DIR = os.path.join(destino, "cache", "checkpoints")
+        os.makedirs(checkpoint.CHECKPOINT_DIR, exist_ok=True)
+    logging.info("🧪 Reproducción aislada: caché y snapshots en %s", destino)
+    _reproduccion_aislada = True
+
+
+def motor_segun_modo(modo: str = REDMINE_CASSETTE_MODO, path: str = REDMINE_CASSETTE, latencia: str = REDMINE_CASSETTE_LATENCIA):
+    """Engine para crear_redmine según REDMINE_CASSETTE_MODO."""
+    global _guardado_registrado
+    if not modo:
+        return MotorGobernado
+    if modo == "grabar":
+        if not _guardado_registrado:
+            atexit.register(guardar_cassette, path)
+            _guardado_registrado = True
+        logging.info("🔴 Grabando tráfico de Redmine en %s", path)
+        return type("MotorGrabador", (Grabador, MotorGobernado), {"grabacion": GRABACION})
+    if modo == "reproducir":
+        logging.info("▶️  Reproduciendo Redmine desde %s (latencia: %s)", path, latencia)
+        aislar_reproduccion()
+        return type("MotorReproductor", (Reproductor,), {"cinta": Cassette.cargar(path), "latencia": _latencia_fija(latencia)})
+    raise ValueError(f"REDMINE_CASSETTE_MODO desconocido: {modo}. Opciones: grabar, reproducir")
+
+# ────────────────────────
+# CLI
+# ────────────────────────
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.redmine_cassette", description="Cassettes de tráfico con Redmine")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    resumen = sub.add_parser("resumen", help="Requests y latencia grabada por endpoint")
+    resumen.add_argument("archivo", nargs="?", default=REDMINE_CASSETTE)
+    args = parser.parse_args(argv)
+
+    cinta = Cassette.cargar(args.archivo)
+    cantidad, latencia, errores = Counter(), Counter(), Counter()
+    for clave, entradas in cinta.requests.items():
+        endpoint = re.sub(r"/\d+", "/:id", clave.split("?")[0])
+        for e in entradas:
+            cantidad[endpoint] += 1
+            latencia[endpoint] += e.get("latencia", 0.0)
+            errores[endpoint] += "error" in e
+    for endpoint, n in cantidad.most_common():
+        print(f"{endpoint:<40} {n:>6} requests  {latencia[endpoint]:>8.1f}s  {errores[endpoint]:>4} errores")
+    print(f"{'TOTAL':<40} {sum(cantidad.values()):>6} requests  {sum(latencia.values()):>8.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 import os
+import logging
+from collections import defaultdict
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta, date
-from redminelib import Redmine
 from redminelib.exceptions import (
     ForbiddenError,
     ResourceNotFoundError,
     ResourceBadMethodError,
     ResourceAttrError,
 )
+from app.utils.redmine_governor import crear_redmine
+from app.utils.fecha import rangos_ventanas
+from app.utils.registros import PAGINA, Issue, fecha_hora, pagina, paginas, versiones
 
 # ────────────────────────
 # CARGA DE CREDENCIALES
@@ -17,7 +22,7 @@ API_KEY = os.getenv("REDMINE_API_KEY")
 if not REDMINE_URL or not API_KEY:
     raise RuntimeError("REDMINE_URL o API_KEY no configurados")
 
-redmine = Redmine(REDMINE_URL.rstrip("/"), key=API_KEY)
+redmine = crear_redmine(REDMINE_URL, API_KEY)
 
 # ────────────────────────
 # OBTENCIÓN DE PROYECTOS
@@ -43,9 +48,17 @@ def get_projects():
 # OBTENCIÓN DE ISSUES SEGURO
 # ────────────────────────
 
-def safe_issues(project_id):
+def safe_issues(project_id, excluir_versiones=()):
+    """
+    Todos los issues del proyecto como registros livianos (sin Resource de redminelib).
+    Los de `excluir_versiones` (ids) los filtra Redmine: no cuestan páginas.
+    """
+    filtros = {"project_id": project_id, "status_id": "*"}
+    if excluir_versiones:
+        # "!a|b": versión distinta de a y b, o sin versión
+        filtros["fixed_version_id"] = "!" + "|".join(str(v) for v in sorted(excluir_versiones))
     try:
-        return redmine.issue.filter(project_id=project_id, status_id="*")
+        return [Issue(raw) for raw in paginas(redmine, "issues", **filtros)]
     except (ForbiddenError, ResourceNotFoundError, ResourceAttrError):
         return []
 
@@ -53,174 +66,441 @@ def safe_issues(project_id):
 # VERIFICA SI UN PROYECTO TIENE TAREAS
 # ────────────────────────
 
-def project_has_relevant(prj):
-    issues = safe_issues(prj.id)
-    return bool(issues)
+def contar_issues(prj):
+    """Alcanza con pedir 1 issue: total_count dice cuántos hay sin descargarlos."""
+    try:
+        return pagina(redmine, "issues", project_id=prj.id, status_id="*", limit=1)[1]
+    except (ForbiddenError, ResourceNotFoundError, ResourceAttrError):
+        return 0
 
-def build_relevant_map(projects):
-    mapa = {}
-    for p in projects:
-        try:
-            mapa[p.id] = project_has_relevant(p)
-        except ForbiddenError:
-            mapa[p.id] = False
-    return mapa
+
+def project_has_relevant(prj):
+    return contar_issues(prj) > 0
 
 # ────────────────────────
 # CADENA DE PADRES
 # ────────────────────────
 
-def parent_chain_names(prj):
+def parent_chain_names(prj, indice=None):
+    """
+    Nombres de los ancestros, del padre a la raíz. `indice` (id → proyecto) evita
+    pedir a Redmine los padres ya conocidos; los que faltan se agregan al índice.
+    """
+    indice = {} if indice is None else indice
     chain, cur = [], prj
     while hasattr(cur, "parent") and hasattr(cur.parent, "id"):
         chain.append(cur.parent.name)
-        try:
-            cur = redmine.project.get(cur.parent.id)
-        except Exception:
-            break
+        pid = cur.parent.id
+        if pid not in indice:
+            try:
+                indice[pid] = redmine.project.get(pid)
+            except Exception:
+                break
+        cur = indice[pid]
     return chain
 
 # ────────────────────────
-# VERIFICACIÓN DE HIJOS
+# SUBÁRBOL DE UN EQUIPO
+# ────────────────────────
+
+def subarbol_equipo(projects, es_equipo):
+    """
+    Proyectos bajo la raíz de un equipo (la raíz incluida); `es_equipo(nombre)` elige la raíz.
+    Se resuelve con el listado ya descargado, así solo se agregan los proyectos de ese equipo.
+    """
+    indice = {p.id: p for p in projects}
+    seleccion = []
+    for p in projects:
+        chain = parent_chain_names(p, indice)
+        if es_equipo(chain[-1] if chain else p.name):
+            seleccion.append(p)
+    return seleccion
+
+# ────────────────────────
+# DETECCIÓN DE CAMBIOS (PROYECTOS "SUCIOS")
+# ────────────────────────
+
+def huella_proyecto(prj):
+    """
+    Firma barata del estado de un proyecto (2 requests de 1 registro):
+    updated_on del proyecto, cantidad y último updated_on de issues,
+    cantidad y último id de time entries. Si no cambia, el proyecto está limpio.
+    Sin permiso para ver time entries la huella sigue valiendo, con esa parte en None.
+    """
+    try:
+        issues, total_issues = pagina(redmine, "issues", project_id=prj.id, status_id="*", sort="updated_on:desc", limit=1)
+    except (ForbiddenError, ResourceNotFoundError, ResourceAttrError):
+        return None
+    try:
+        entries, total_entries = pagina(redmine, "time_entries", project_id=prj.id, limit=1)
+    except ForbiddenError:
+        entries, total_entries = [], None
+
+    # Mismo formato que con los Resource, así las huellas guardadas siguen siendo comparables
+    return (
+        str(getattr(prj, "updated_on", "")),
+        total_issues,
+        fecha_hora(issues[0].get("updated_on")) if issues else "",
+        total_entries,
+        entries[0]["id"] if entries else None,
+    )
+
+# ────────────────────────
+# AGREGACIÓN POR VERSIÓN
+# ────────────────────────
+
+ESTADOS_CERRADOS = (6, 5, 21, 9)
+
+
+def _contar_entre(fechas, desde, hasta):
+    """Cantidad de fechas en [desde, hasta]; `fechas` debe estar ordenada."""
+    return bisect_right(fechas, hasta) - bisect_left(fechas, desde)
+
+
+def _agregar_issues(issues, horas_por_issue):
+    """
+    Agrupa los issues por versión y acumula las métricas que no dependen de la fecha
+    de corrida. Las fechas de cierre/modificación se guardan ordenadas para calcular
+    cualquier cantidad de ventanas con búsqueda binaria (y reutilizarlas en corridas siguientes).
+    """
+    versions_data = {}
+
+    for i in issues:
+        version_name = i.version
+
+        # Inicializar la versión si no existe
+        if version_name not in versions_data:
+            versions_data[version_name] = {
+                "Version": version_name,
+                "Fecha de inicio": None,
+                "Fecha finalización": None,
+                "Tareas totales": 0,
+                "Tareas abiertas": 0,
+                "Horas estimadas": 0.0,
+                "Horas insumidas": 0.0,
+                "cerradas": [],
+                "modificadas": [],
+            }
+
+        rec = versions_data[version_name]
+        rec["Tareas totales"] += 1
+
+        # Fechas
+        if i.inicio and (rec["Fecha de inicio"] is None or i.inicio < rec["Fecha de inicio"]):
+            rec["Fecha de inicio"] = i.inicio
+        if i.fin and (rec["Fecha finalización"] is None or i.fin > rec["Fecha finalización"]):
+            rec["Fecha finalización"] = i.fin
+
+        # Estado de tareas
+        if i.estado in ESTADOS_CERRADOS:
+            if i.cerrado:
+                rec["cerradas"].append(i.cerrado)
+        else:
+            rec["Tareas abiertas"] += 1
+
+        # Actualizaciones
+        if i.modificado:
+            rec["modificadas"].append(i.modificado)
+
+        # Horas estimadas
+        if i.estimadas:
+            rec["Horas estimadas"] += round(i.estimadas, 2)
+
+        # Horas insumidas
+        rec["Horas insumidas"] += horas_por_issue.get(i.id, 0.0)
+
+    for rec in versions_data.values():
+        rec["cerradas"].sort()
+        rec["modificadas"].sort()
+
+    return versions_data
+
+
+def _fusionar(acc, otro):
+    """Suma a `acc` el acumulado de otra versión con el mismo nombre."""
+    for campo in ("Tareas totales", "Tareas abiertas", "Horas estimadas", "Horas insumidas"):
+        acc[campo] += otro[campo]
+    inicios = [f for f in (acc["Fecha de inicio"], otro["Fecha de inicio"]) if f]
+    fines = [f for f in (acc["Fecha finalización"], otro["Fecha finalización"]) if f]
+    acc["Fecha de inicio"] = min(inicios, default=None)
+    acc["Fecha finalización"] = max(fines, default=None)
+    acc["cerradas"] = sorted(acc["cerradas"] + otro["cerradas"])
+    acc["modificadas"] = sorted(acc["modificadas"] + otro["modificadas"])
+
+# ────────────────────────
+# PODA DE VERSIONES CERRADAS
 # ────────────────────────
 
-def has_children(pid):
+# congelar → una versión cerrada (sin cambios hace VERSIONES_CONGELAR_DIAS) se agrega una última vez,
+#            su acumulado se guarda y desde ahí sus issues se excluyen del pedido (fixed_version_id)
+#            (solo en proyectos de más de una página de issues: en los chicos no ahorra requests).
+#            Como el estado incremental, se vuelve a agregar cada PROJECT_STATE_MAX_DAYS: así entran
+#            las ediciones y horas cargadas después del cierre, que no cambian la versión
+# omitir   → esas versiones se excluyen del pedido y no aparecen en el reporte (todos los proyectos)
+# incluir  → sin poda: siempre se piden todos los issues
+VERSIONES_CERRADAS = os.getenv("VERSIONES_CERRADAS", "congelar").lower()
+VERSIONES_ESTADOS_CERRADOS = tuple(e.strip() for e in os.getenv("VERSIONES_ESTADOS_CERRADOS", "closed,locked").split(","))
+VERSIONES_CONGELAR_DIAS = int(os.getenv("VERSIONES_CONGELAR_DIAS", 30))
+
+
+def versiones_podables(project_id, today=None):
+    """Ids de las versiones cerradas/bloqueadas sin cambios (entrega y última edición) hace más de N días."""
+    limite = (today or date.today()) - timedelta(days=VERSIONES_CONGELAR_DIAS)
     try:
-        for _ in redmine.project.filter(parent_id=pid, limit=1):
-            return True
-    except Exception:
-        pass
-    return False
+        disponibles = versiones(redmine, project_id)
+    except (ForbiddenError, ResourceNotFoundError):
+        return set()
+    podables = set()
+    for v in disponibles:
+        fechas = [f for f in (v.fecha, v.modificada) if f]
+        if v.estado in VERSIONES_ESTADOS_CERRADOS and fechas and max(fechas) <= limite:
+            podables.add(v.id)
+    return podables
+
+
+def _agregar_proyecto(project_id, total_issues, politica=None):
+    """Acumulados por versión del proyecto, sin pedir los issues de versiones cerradas ya congeladas."""
+    from app.utils.cache_manager import PROJECT_STATE_MAX_DAYS, load_versiones_congeladas, save_versiones_congeladas
+
+    politica = politica or VERSIONES_CERRADAS
+    grande = total_issues > PAGINA
+    podables = versiones_podables(project_id) if politica == "omitir" or (politica == "congelar" and grande) else set()
+    if politica != "congelar" or not grande:
+        issues = safe_issues(project_id, excluir_versiones=podables)
+        return _agregar_issues(issues, horas_por_issue(project_id, issues))
+
+    # Las congeladas que se reabrieron (o ya no existen) y las vencidas se descartan y vuelven a pedirse
+    hoy = date.today()
+    vigencia = hoy - timedelta(days=PROJECT_STATE_MAX_DAYS)
+    guardadas = load_versiones_congeladas(project_id)
+    congeladas = {vid: g for vid, g in guardadas.items() if vid in podables and g.get("congelada", date.min) >= vigencia}
+    issues = safe_issues(project_id, excluir_versiones=congeladas)
+    horas = horas_por_issue(project_id, issues)
+    versions_data = _agregar_issues(issues, horas)
+
+    # Las podables que todavía no estaban congeladas se agregaron completas en este pedido
+    por_version = defaultdict(list)
+    for i in issues:
+        if i.version_id in podables:
+            por_version[i.version_id].append(i)
+    nuevas = {
+        vid: {"congelada": hoy, "acc": next(iter(_agregar_issues(grupo, horas).values()))}
+        for vid, grupo in por_version.items()
+    }
+
+    for acc in (g["acc"] for g in congeladas.values()):
+        if acc["Version"] in versions_data:
+            _fusionar(versions_data[acc["Version"]], acc)
+        else:
+            versions_data[acc["Version"]] = dict(acc, cerradas=list(acc["cerradas"]), modificadas=list(acc["modificadas"]))
+
+    if nuevas or len(congeladas) != len(guardadas):
+        save_versiones_congeladas(project_id, {**congeladas, **nuevas})
+    if congeladas or nuevas:
+        logging.info(
+            "🧊 Proyecto %s: %s versiones cerradas fuera del pedido, %s congeladas en esta corrida",
+            project_id, len(congeladas), len(nuevas),
+        )
+    return versions_data
+
+
+def _fila_version(equipo, proyecto_name, acc, ventanas):
+    """Arma la fila del reporte a partir del acumulado de una versión."""
+    rec = {
+        "Equipo": equipo,
+        "Proyecto": proyecto_name,
+        "Version": acc["Version"],
+        "Fecha de inicio": acc["Fecha de inicio"],
+        "Fecha finalización": acc["Fecha finalización"],
+        "Tareas totales": acc["Tareas totales"],
+        "Tareas abiertas": acc["Tareas abiertas"],
+    }
+    for nombre, (desde, hasta) in ventanas.items():
+        rec[f"Tareas modificadas {nombre}"] = _contar_entre(acc["modificadas"], desde, hasta)
+        rec[f"Tareas cerradas {nombre}"] = _contar_entre(acc["cerradas"], desde, hasta)
+
+    rec["Horas estimadas"] = round(acc["Horas estimadas"], 2)
+    rec["Horas insumidas"] = round(acc["Horas insumidas"], 2)
+
+    rec["Progreso tareas"] = f"{((rec['Tareas totales'] - rec['Tareas abiertas']) / rec['Tareas totales'] * 100):.2f}%" if rec["Tareas totales"] > 0 else "0.00%"
+    rec["Horas consumidas"] = f"{rec['Horas insumidas'] / rec['Horas estimadas'] * 100:.2f}%" if rec["Horas estimadas"] > 0 else "0.00%"
+    return rec
+
+# ────────────────────────
+# HORAS INSUMIDAS POR ISSUE
+# ────────────────────────
+
+# issues       → spent_hours del propio issue; time entries solo si el servidor no lo informa
+# time_entries → suma de time entries cacheados (descarga el histórico del proyecto)
+# verificar    → calcula ambos, loguea diferencias y usa time entries
+HORAS_FUENTE = os.getenv("HORAS_FUENTE", "issues").lower()
+
+
+def _horas_desde_time_entries(project_id):
+    from app.utils.cache_manager import get_cached_time_entries
+
+    # Cache de time entries
+    try:
+        entries_all = get_cached_time_entries(redmine, project_id, months=12)
+    except ForbiddenError:
+        entries_all = []
+
+    horas = {}
+    for e in entries_all:
+        if e.issue_id:
+            horas[e.issue_id] = horas.get(e.issue_id, 0.0) + round(e.horas, 2)
+    return horas
+
+
+def _horas_desde_issues(issues):
+    """spent_hours de cada issue, o None si el servidor no lo incluye en alguno."""
+    horas = {}
+    for i in issues:
+        if i.insumidas is None:
+            return None
+        horas[i.id] = round(float(i.insumidas), 2)
+    return horas
+
+
+def horas_por_issue(project_id, issues, fuente=HORAS_FUENTE):
+    """Horas insumidas por issue id, según la fuente configurada."""
+    desde_issues = _horas_desde_issues(issues) if fuente in ("issues", "verificar") else None
+    if fuente == "issues" and desde_issues is not None:
+        return desde_issues
+
+    desde_te = _horas_desde_time_entries(project_id)
+    if fuente == "verificar" and desde_issues is not None:
+        difieren = [
+            (iid, desde_issues.get(iid, 0.0), desde_te.get(iid, 0.0))
+            for iid in set(desde_issues) | set(desde_te)
+            if abs(desde_issues.get(iid, 0.0) - desde_te.get(iid, 0.0)) > 0.01
+        ]
+        if difieren:
+            logging.warning(
+                "⚖️  Proyecto %s: %s issues con horas distintas (issue, spent_hours, time entries): %s",
+                project_id, len(difieren), sorted(difieren)[:10],
+            )
+    return desde_te
 
 # ────────────────────────
 # PROCESAMIENTO PRINCIPAL DE PROYECTOS
 # ────────────────────────
 
-def process_projects(projects):
-    rel_map = build_relevant_map(projects)
+REPORTE_INCREMENTAL = os.getenv("REPORTE_INCREMENTAL", "true").lower() == "true"
 
-    today = datetime.today()
-    start_30 = (today - timedelta(days=30)).date()
-    end_today = today.date()
 
-    weekday = today.weekday()
-    days_since_saturday = (weekday - 5) % 7
-    last_saturday = (today - timedelta(days=days_since_saturday)).date()
-    last_sunday = last_saturday - timedelta(days=6)
+KEYWORDS_EQUIPOS = ("DATA", "CONSULTORIA", "DESARROLLO", "TECNOLOGIA")
 
-    data = []
-    keywords = ("DATA", "CONSULTORIA", "DESARROLLO", "TECNOLOGIA")
 
-    for prj in projects:
-        if not rel_map.get(prj.id):
-            continue
+def _equipo(prj, indice):
+    """Nombre del equipo: la raíz de la cadena de padres (solo para proyectos de nivel ≥ 2)."""
+    chain = parent_chain_names(prj, indice)
+    return chain[-1] if len(chain) > 1 else ""
 
-        chain = parent_chain_names(prj)
-        equipo = chain[-1] if len(chain) > 1 else ""
 
-        if not any(kw in equipo.upper() for kw in keywords):
-            continue
+def _procesar_proyecto(prj, indice, ventanas, previo, incremental):
+    """
+    Filas del reporte de un proyecto y su estado para la próxima corrida incremental.
+    Devuelve (filas, estado, reutilizado).
+    """
+    # El equipo sale del índice de proyectos (sin requests): los ajenos se descartan primero
+    equipo = _equipo(prj, indice)
 
-        es_padre = has_children(prj.id)
-        proyecto_name = "" if es_padre else prj.name
+    if not any(kw in equipo.upper() for kw in KEYWORDS_EQUIPOS):
+        return [], None, False
 
-        issues = safe_issues(prj.id)
+    # La huella ya trae la cantidad de issues; sin incremental se hace el sondeo de 1 issue
+    if incremental:
+        huella = huella_proyecto(prj)
+        total_issues = huella[1] if huella is not None else 0
+    else:
+        huella, total_issues = None, contar_issues(prj)
+    if not total_issues:
+        return [], None, False
 
-        # Cache de time entries
-        from app.utils.cache_manager import get_cached_time_entries
-        try:
-            entries_all = get_cached_time_entries(redmine, prj.id, months=12)
-        except ForbiddenError:
-            entries_all = []
-
-        # Armado del diccionario por issue
-        te_by_issue = {}
-        for e in entries_all:
-            if hasattr(e, "issue") and e.issue:
-                te_by_issue.setdefault(e.issue.id, []).append(e)
-
-        # Agrupar issues por versión
-        versions_data = {}
-        
-        for i in issues:
-            # Obtener la versión
-            version_name = "Sin versión"
-            if hasattr(i, "fixed_version") and i.fixed_version:
-                version_name = getattr(i.fixed_version, "name", "Sin versión")
-            
-            # Inicializar la versión si no existe
-            if version_name not in versions_data:
-                versions_data[version_name] = {
-                    "Equipo": equipo,
-                    "Proyecto": proyecto_name,
-                    "Version": version_name,
-                    "Fecha de inicio": None,
-                    "Fecha finalización": None,
-                    "Tareas totales": 0,
-                    "Tareas abiertas": 0,
-                    "Tareas modificadas última semana": 0,
-                    "Tareas cerradas última semana": 0,
-                    "Tareas modificadas últimos 30 días": 0,
-                    "Tareas cerradas últimos 30 días": 0,
-                    "Horas estimadas": 0.0,
-                    "Horas insumidas": 0.0,
-                }
-
-            rec = versions_data[version_name]
-            rec["Tareas totales"] += 1
-
-            # Fechas
-            s = getattr(i, "start_date", None)
-            if s:
-                s_date = s.date() if hasattr(s, "date") else s
-                if rec["Fecha de inicio"] is None or s_date < rec["Fecha de inicio"]:
-                    rec["Fecha de inicio"] = s_date
-
-            d = getattr(i, "due_date", None)
-            if d:
-                d_date = d.date() if hasattr(d, "date") else d
-                if rec["Fecha finalización"] is None or d_date > rec["Fecha finalización"]:
-                    rec["Fecha finalización"] = d_date
-
-            # Estado de tareas
-            st = getattr(i.status, "id", None)
-            if st in (6, 5, 21, 9):
-                c = getattr(i, "closed_on", None)
-                if c:
-                    c_date = c.date()
-                    if last_sunday <= c_date <= last_saturday:
-                        rec["Tareas cerradas última semana"] += 1
-                    if start_30 <= c_date <= end_today:
-                        rec["Tareas cerradas últimos 30 días"] += 1
-            else:
-                rec["Tareas abiertas"] += 1
-
-            # Actualizaciones
-            u = getattr(i, "updated_on", None)
-            if u:
-                u_date = u.date()
-                if last_sunday <= u_date <= last_saturday:
-                    rec["Tareas modificadas última semana"] += 1
-                if start_30 <= u_date <= end_today:
-                    rec["Tareas modificadas últimos 30 días"] += 1
-
-            # Horas estimadas
-            est = getattr(i, "estimated_hours", None)
-            if est:
-                rec["Horas estimadas"] += round(est, 2)
-
-            # Horas insumidas
-            for e in te_by_issue.get(i.id, []):
-                rec["Horas insumidas"] += round(float(e.hours or 0), 2)
-
-        # Calcular métricas finales para cada versión
-        for version_name, rec in versions_data.items():
-            rec["Horas estimadas"] = round(rec["Horas estimadas"], 2)
-            rec["Horas insumidas"] = round(rec["Horas insumidas"], 2)
-
-            rec["Progreso tareas"] = f"{((rec['Tareas totales'] - rec['Tareas abiertas']) / rec['Tareas totales'] * 100):.2f}%" if rec["Tareas totales"] > 0 else "0.00%"
-            rec["Horas consumidas"] = f"{rec['Horas insumidas'] / rec['Horas estimadas'] * 100:.2f}%" if rec["Horas estimadas"] > 0 else "0.00%"
-
-            data.append(rec)
-
-    return data
\ No newline at end of file
+    # Los proyectos padre se listan con su nombre, como cualquier otro: el chequeo de hijos
+    # original (project.filter por parent_id) no existe en redminelib y nunca los distinguió
+    proyecto_name = prj.name
+
+    reutilizado = huella is not None and previo is not None and previo["huella"] == huella
+
+    if reutilizado:
+        versions_data = previo["versiones"]
+        agregado = previo["agregado"]
+        # Estados guardados antes de ordenar las fechas (ordenar una lista ya ordenada es O(n))
+        for acc in versions_data.values():
+            acc["cerradas"].sort()
+            acc["modificadas"].sort()
+    else:
+        agregado = date.today()
+        versions_data = _agregar_proyecto(prj.id, total_issues)
+
+    estado = {"huella": huella, "versiones": versions_data, "agregado": agregado} if huella is not None else None
+
+    # Calcular métricas finales para cada versión
+    filas = [_fila_version(equipo, proyecto_name, acc, ventanas) for acc in versions_data.values()]
+    return filas, estado, reutilizado
+
+
+def process_projects(projects, incremental: bool = REPORTE_INCREMENTAL, run_id=None):
+    """
+    Devuelve una fila por (proyecto, versión).
+    Con `incremental`, solo se re-agregan los proyectos cuya huella cambió desde la
+    corrida anterior; para el resto se reutilizan los acumulados guardados y solo se
+    recalculan las ventanas de fechas.
+    Con `run_id`, cada proyecto terminado se guarda en el checkpoint de esa corrida y,
+    si la corrida se reintenta, los proyectos ya guardados no se vuelven a consultar.
+    """
+    return [fila for _, filas in procesar_por_equipo(projects, incremental, run_id) for fila in filas]
+
+
+def procesar_por_equipo(projects, incremental: bool = REPORTE_INCREMENTAL, run_id=None):
+    """
+    Igual que process_projects, pero recorre los proyectos agrupados por equipo y entrega
+    (equipo, filas) apenas termina cada equipo, para poder mostrar resultados parciales.
+    """
+    from app.utils.cache_manager import load_project_state, save_project_state
+    from app.utils.checkpoint import cargar_checkpoint, guardar_en_checkpoint
+
+    completados = cargar_checkpoint(run_id) if run_id else {}
+    if completados:
+        logging.info("⏯  Reanudando corrida %s: %s proyectos ya procesados", run_id, len(completados))
+
+    indice = {p.id: p for p in projects}
+    por_equipo = defaultdict(list)
+    for prj in projects:
+        por_equipo[_equipo(prj, indice)].append(prj)
+
+    ventanas = rangos_ventanas(datetime.today())
+    estado = load_project_state() if incremental else {}
+    # Se parte del estado anterior: los proyectos fuera de este recorrido (p. ej. de otros
+    # equipos) o que no se llegaron a procesar (corrida cortada) lo conservan
+    nuevo_estado = dict(estado)
+    reutilizados = 0
+
+    try:
+        for equipo in sorted(por_equipo):
+            data = []
+            for prj in por_equipo[equipo]:
+                if prj.id in completados:
+                    filas, estado_prj = completados[prj.id]["filas"], completados[prj.id]["estado"]
+                else:
+                    filas, estado_prj, reutilizado = _procesar_proyecto(
+                        prj, indice, ventanas, estado.get(prj.id), incremental
+                    )
+                    reutilizados += reutilizado
+                    if run_id:
+                        guardar_en_checkpoint(run_id, prj.id, filas, estado_prj)
+
+                data.extend(filas)
+                if estado_prj is not None:
+                    nuevo_estado[prj.id] = estado_prj
+                else:
+                    nuevo_estado.pop(prj.id, None)
+
+            if data:
+                yield equipo, data
+    finally:
+        if incremental:
+            save_project_state(nuevo_estado)
+            logging.info("♻️  Proyectos sin cambios reutilizados: %s", reutilizados)
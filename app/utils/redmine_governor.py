@@ -0,0 +1,178 @@
+# app/utils/redmine_governor.py
+"""
+Regulador de tráfico hacia Redmine, compartido por todos los clientes del proceso:
+  • Tope de requests por segundo (REDMINE_RPS)
+  • Reintentos de 429 / 5xx / timeouts con backoff exponencial con jitter
+  • Concurrencia adaptativa AIMD: +1/limite por éxito rápido, mitad ante error o latencia alta
+
+Se engancha en redminelib como engine (MotorGobernado), así cada request que haga
+cualquier manager (project, issue, time_entry, group, user…) pasa por acá.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+import requests
+from redminelib import Redmine
+from redminelib.engines.sync import SyncEngine
+
+T = TypeVar("T")
+
+# ───────────── Config .env ─────────────
+REDMINE_RPS               = float(os.getenv("REDMINE_RPS", 5))
+REDMINE_MAX_REINTENTOS    = int(os.getenv("REDMINE_MAX_REINTENTOS", 4))
+REDMINE_BACKOFF_BASE      = float(os.getenv("REDMINE_BACKOFF_BASE", 0.5))
+REDMINE_BACKOFF_MAX       = float(os.getenv("REDMINE_BACKOFF_MAX", 30))
+REDMINE_CONCURRENCIA_MAX  = int(os.getenv("REDMINE_CONCURRENCIA_MAX", 4))
+REDMINE_LATENCIA_OBJETIVO = float(os.getenv("REDMINE_LATENCIA_OBJETIVO", 2.0))
+REDMINE_TIMEOUT           = float(os.getenv("REDMINE_TIMEOUT", 60))
+
+# Códigos HTTP transitorios (429 siempre se reintenta; 5xx solo en lecturas)
+STATUS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+
+class ErrorTransitorio(Exception):
+    """Respuesta HTTP que conviene reintentar; conserva la respuesta original."""
+
+    def __init__(self, respuesta: requests.Response):
+        self.respuesta = respuesta
+        self.status_code = respuesta.status_code
+        super().__init__(f"Redmine respondió {respuesta.status_code}")
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        try:
+            return float(self.respuesta.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+
+
+class GobernadorRedmine:
+    def __init__(
+        self,
+        rps: float = REDMINE_RPS,
+        max_reintentos: int = REDMINE_MAX_REINTENTOS,
+        backoff_base: float = REDMINE_BACKOFF_BASE,
+        backoff_max: float = REDMINE_BACKOFF_MAX,
+        concurrencia_max: int = REDMINE_CONCURRENCIA_MAX,
+        latencia_objetivo: float = REDMINE_LATENCIA_OBJETIVO,
+    ):
+        self.intervalo = 1.0 / rps if rps > 0 else 0.0
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concurrencia_max = max(1, concurrencia_max)
+        self.latencia_objetivo = latencia_objetivo
+
+        self.limite = 1.0  # concurrencia permitida (AIMD), arranca conservadora
+        self._en_vuelo = 0
+        self._cond = threading.Condition()
+        self._turno_lock = threading.Lock()
+        self._proximo_turno = 0.0
+
+    # ──────── tope de requests por segundo ────────
+    def _esperar_turno(self) -> None:
+        if not self.intervalo:
+            return
+        with self._turno_lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo_turno)
+            self._proximo_turno = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+    # ──────── concurrencia adaptativa ────────
+    @contextmanager
+    def _slot(self):
+        with self._cond:
+            while self._en_vuelo >= int(self.limite):
+                self._cond.wait()
+            self._en_vuelo += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._en_vuelo -= 1
+                self._cond.notify_all()
+
+    def _ajustar(self, latencia: float, error: bool) -> None:
+        with self._cond:
+            if error or latencia > self.latencia_objetivo:
+                self.limite = max(1.0, self.limite / 2)
+            else:
+                self.limite = min(float(self.concurrencia_max), self.limite + 1.0 / self.limite)
+            self._cond.notify_all()
+
+    # ──────── reintentos ────────
+    @staticmethod
+    def _es_reintentable(exc: Exception, lectura: bool) -> bool:
+        if isinstance(exc, ErrorTransitorio):
+            return exc.status_code == 429 or lectura
+        return lectura and isinstance(exc, (requests.Timeout, requests.ConnectionError))
+
+    def _espera(self, intento: int, exc: Exception) -> float:
+        espera = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+        retry_after = getattr(exc, "retry_after", None)
+        return max(espera, retry_after) if retry_after else espera
+
+    def ejecutar(self, fn: Callable[[], T], lectura: bool = True, descripcion: str = "") -> T:
+        """Ejecuta `fn` respetando el tope de RPS y la concurrencia, reintentando errores transitorios."""
+        for intento in range(self.max_reintentos + 1):
+            with self._slot():
+                self._esperar_turno()
+                inicio = time.monotonic()
+                try:
+                    resultado = fn()
+                except Exception as exc:
+                    reintentable = self._es_reintentable(exc, lectura)
+                    self._ajustar(time.monotonic() - inicio, error=reintentable)
+                    if not reintentable or intento == self.max_reintentos:
+                        raise
+                    error = exc
+                else:
+                    self._ajustar(time.monotonic() - inicio, error=False)
+                    return resultado
+
+            espera = self._espera(intento, error)
+            logging.warning(
+                "🔁 Redmine %s: %s (intento %s/%s); reintento en %.1fs",
+                descripcion, error, intento + 1, self.max_reintentos, espera,
+            )
+            time.sleep(espera)
+
+
+# Instancia única: todos los clientes del proceso comparten cupo de RPS y concurrencia
+GOBERNADOR = GobernadorRedmine()
+
+
+class MotorGobernado(SyncEngine):
+    """Engine de redminelib que envía cada request a través de GOBERNADOR."""
+
+    gobernador = GOBERNADOR
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        kwargs = self.construct_request_kwargs(method, headers, params, data)
+
+        def _enviar():
+            respuesta = self.session.request(method, url, timeout=REDMINE_TIMEOUT, **kwargs)
+            if respuesta.status_code in STATUS_REINTENTABLES:
+                raise ErrorTransitorio(respuesta)
+            return respuesta
+
+        try:
+            respuesta = self.gobernador.ejecutar(_enviar, lectura=method.lower() == "get", descripcion=f"{method.upper()} {url}")
+        except ErrorTransitorio as exc:
+            # Agotados los reintentos: se devuelve el error propio de redminelib (ServerError, etc.)
+            respuesta = exc.respuesta
+        return self.process_response(respuesta)
+
+
+def crear_redmine(url: str, key: str) -> Redmine:
+    """Cliente Redmine con el engine gobernado (o el que graba/reproduce, según REDMINE_CASSETTE_MODO)."""
+    from app.utils.redmine_cassette import motor_segun_modo
+    return Redmine(url.rstrip("/"), key=key, engine=motor_segun_modo())
@@ -0,0 +1,98 @@
+# app/utils/registros.py
+"""
+Lectura liviana de la API REST de Redmine, sin los Resource de redminelib:
+  • pagina() / paginas(): JSON crudo por página, a través del engine del cliente
+    (regulador, cassettes y el Redmine falso de las pruebas siguen aplicando)
+  • versiones(): versiones de un proyecto (propias y compartidas), en una request
+  • Issue / TimeEntry / Version: registros con __slots__ y solo los campos que usa el reporte,
+    con las fechas convertidas una sola vez
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PAGINA = 100  # máximo por página de la API de Redmine
+
+
+def pagina(redmine, contenedor: str, **params) -> Tuple[List[Dict[str, Any]], int]:
+    """Una request a `/<contenedor>.json`: filas crudas y total_count."""
+    respuesta = redmine.engine.request("get", f"{redmine.url}/{contenedor}.json", params=params)
+    filas = respuesta.get(contenedor, [])
+    return filas, respuesta.get("total_count", len(filas))
+
+
+def paginas(redmine, contenedor: str, **params) -> Iterator[Dict[str, Any]]:
+    """Todas las filas crudas de `/<contenedor>.json`, pidiendo de a PAGINA."""
+    offset = 0
+    while True:
+        filas, total = pagina(redmine, contenedor, **params, limit=PAGINA, offset=offset)
+        yield from filas
+        offset += len(filas)
+        if not filas or offset >= total:
+            return
+
+
+def versiones(redmine, project_id) -> List["Version"]:
+    """Versiones disponibles para el proyecto; Redmine las devuelve todas sin paginar."""
+    respuesta = redmine.engine.request("get", f"{redmine.url}/projects/{project_id}/versions.json", params={})
+    return [Version(raw) for raw in respuesta.get("versions", [])]
+
+
+def _fecha(valor: Optional[str]) -> Optional[date]:
+    """'2024-05-01' o '2024-05-01T13:45:00Z' → date (como .date() de redminelib, en UTC)."""
+    return date.fromisoformat(valor[:10]) if valor else None
+
+
+def fecha_hora(valor: Optional[str]) -> str:
+    """
+    Igual que str() de la fecha-hora que arma redminelib ('2024-05-01 13:45:00'); '' si falta.
+    Con otro formato (fracciones de segundo, zona horaria) se devuelve tal cual, como redminelib.
+    """
+    if not valor:
+        return ""
+    try:
+        return str(datetime.strptime(valor, "%Y-%m-%dT%H:%M:%SZ"))
+    except ValueError:
+        return valor
+
+# ────────────────────────
+# REGISTROS
+# ────────────────────────
+
+class Issue:
+    __slots__ = ("id", "version_id", "version", "estado", "inicio", "fin", "cerrado", "modificado", "estimadas", "insumidas")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.id = raw["id"]
+        version = raw.get("fixed_version") or {}
+        self.version_id = version.get("id")
+        self.version = version.get("name", "Sin versión")
+        self.estado = raw["status"]["id"]
+        self.inicio = _fecha(raw.get("start_date"))
+        self.fin = _fecha(raw.get("due_date"))
+        self.cerrado = _fecha(raw.get("closed_on"))
+        self.modificado = _fecha(raw.get("updated_on"))
+        self.estimadas = raw.get("estimated_hours")
+        self.insumidas = raw.get("spent_hours")  # None si el servidor no lo informa
+
+
+class TimeEntry:
+    __slots__ = ("id", "issue_id", "horas")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.id = raw["id"]
+        self.issue_id = (raw.get("issue") or {}).get("id")
+        self.horas = float(raw.get("hours") or 0)
+
+
+class Version:
+    __slots__ = ("id", "nombre", "estado", "fecha", "modificada", "compartida", "proyecto_id")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.id = raw["id"]
+        self.nombre = raw.get("name", "")
+        self.estado = raw.get("status", "open")         # open | locked | closed
+        self.fecha = _fecha(raw.get("effective_date"))  # fecha de entrega
+        self.modificada = _fecha(raw.get("updated_on"))
+        self.compartida = raw.get("sharing", "none")     # none | descendants | hierarchy | tree | system
+        self.proyecto_id = (raw.get("project") or {}).get("id")  # dueño (distinto si es compartida)
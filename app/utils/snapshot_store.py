@@ -0,0 +1,249 @@
+# app/utils/snapshot_store.py
+"""
+Histórico de métricas por versión en SQLite (`data/snapshots.sqlite3`):
+  • Un snapshot fechado por corrida de process_projects (se reemplaza si se corre de nuevo el mismo día)
+  • Indexado por equipo, proyecto y versión
+  • Consultas de tendencia (semanal o diaria) sin tráfico a Redmine
+"""
+
+import os
+import json
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils.fecha import REPORTE_VENTANAS, nombres_ventanas
+
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", os.path.join("data", "snapshots.sqlite3"))
+# Un equipo sin snapshot en estos días antes del más reciente (renombrado, cerrado) deja de mostrarse
+SNAPSHOT_EQUIPO_MAX_DIAS = int(os.getenv("SNAPSHOT_EQUIPO_MAX_DIAS", 7))
+
+# Ventanas con columna SQL propia (métricas de /api/tendencias); las demás van en `extra`
+_VENTANAS_SQL = {
+    "última semana": ("tareas_mod_semana", "tareas_cerr_semana"),
+    "últimos 30 días": ("tareas_mod_30", "tareas_cerr_30"),
+}
+METRICAS = (
+    "tareas_totales", "tareas_abiertas",
+    *(col for cols in _VENTANAS_SQL.values() for col in cols),
+    "horas_estimadas", "horas_insumidas",
+)
+
+
+def columnas(claves: str = REPORTE_VENTANAS) -> Dict[str, str]:
+    """Columna del reporte → columna SQL, según las ventanas configuradas (solo métricas numéricas y fechas)."""
+    mapa = {
+        "Fecha de inicio": "fecha_inicio",
+        "Fecha finalización": "fecha_fin",
+        "Tareas totales": "tareas_totales",
+        "Tareas abiertas": "tareas_abiertas",
+    }
+    for nombre in nombres_ventanas(claves):
+        if nombre in _VENTANAS_SQL:
+            mod, cerr = _VENTANAS_SQL[nombre]
+            mapa[f"Tareas modificadas {nombre}"] = mod
+            mapa[f"Tareas cerradas {nombre}"] = cerr
+    mapa["Horas estimadas"] = "horas_estimadas"
+    mapa["Horas insumidas"] = "horas_insumidas"
+    return mapa
+
+
+def _columnas_ventanas(claves: str = REPORTE_VENTANAS) -> set:
+    return {f"Tareas {tipo} {nombre}" for nombre in nombres_ventanas(claves) for tipo in ("modificadas", "cerradas")}
+
+
+COLUMNAS = columnas()
+COLUMNAS_VENTANAS = _columnas_ventanas()
+_CLAVE = ("Equipo", "Proyecto", "Version")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshot (
+    fecha    TEXT NOT NULL,
+    equipo   TEXT NOT NULL,
+    alias    TEXT NOT NULL,
+    proyecto TEXT NOT NULL,
+    version  TEXT NOT NULL,
+    fecha_inicio TEXT,
+    fecha_fin    TEXT,
+    {", ".join(f"{m} REAL" for m in METRICAS)},
+    extra    TEXT,
+    PRIMARY KEY (fecha, equipo, proyecto, version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_snapshot_serie ON snapshot (alias, proyecto, version, fecha);
+CREATE INDEX IF NOT EXISTS ix_snapshot_equipo ON snapshot (equipo, fecha);
+"""
+
+
+_schema_listo = set()
+
+
+@contextmanager
+def _conectar():
+    """Conexión con commit/rollback automático; crea el esquema la primera vez."""
+    if SNAPSHOT_DB not in _schema_listo:
+        os.makedirs(os.path.dirname(SNAPSHOT_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(SNAPSHOT_DB)
+    conn.row_factory = sqlite3.Row
+    try:
+        if SNAPSHOT_DB not in _schema_listo:
+            conn.executescript(_SCHEMA)
+            _schema_listo.add(SNAPSHOT_DB)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _iso(valor) -> Optional[str]:
+    return valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+
+# ────────────────────────
+# ESCRITURA
+# ────────────────────────
+
+def guardar_snapshot(
+    data: List[Dict[str, Any]],
+    alias_de: Callable[[str], str] = str.lower,
+    fecha: Optional[date] = None,
+) -> int:
+    """
+    Persiste las filas de process_projects como el snapshot de `fecha` (hoy por defecto).
+    Reemplaza lo ya guardado ese día para los equipos presentes en `data`.
+    """
+    fecha = (fecha or date.today()).isoformat()
+    filas = []
+    for r in data:
+        extra = {k: _iso(v) for k, v in r.items() if k not in COLUMNAS and k not in _CLAVE}
+        filas.append(
+            (fecha, r.get("Equipo") or "", alias_de(r.get("Equipo") or ""), r.get("Proyecto") or "", r.get("Version") or "")
+            + tuple(_iso(r.get(k)) for k in COLUMNAS)
+            + (json.dumps(extra, ensure_ascii=False),)
+        )
+
+    equipos = sorted({f[1] for f in filas})
+    with _conectar() as conn:
+        conn.executemany(
+            "DELETE FROM snapshot WHERE fecha = ? AND equipo = ?", [(fecha, eq) for eq in equipos]
+        )
+        conn.executemany(
+            f"INSERT INTO snapshot (fecha, equipo, alias, proyecto, version, {', '.join(COLUMNAS.values())}, extra) "
+            f"VALUES ({', '.join('?' * (len(COLUMNAS) + 6))})",
+            filas,
+        )
+    logging.info("🗄  Snapshot %s guardado: %s versiones", fecha, len(filas))
+    return len(filas)
+
+# ────────────────────────
+# LECTURA
+# ────────────────────────
+
+def _filtros(equipo: Optional[str], proyecto: Optional[str], version: Optional[str]):
+    where, params = [], []
+    if equipo:
+        where.append("(s.alias = ? OR s.equipo = ? COLLATE NOCASE)")
+        params += [equipo.lower(), equipo]
+    if proyecto:
+        where.append("s.proyecto = ?")
+        params.append(proyecto)
+    if version:
+        where.append("s.version = ?")
+        params.append(version)
+    return where, params
+
+
+def fecha_ultimo_snapshot() -> Optional[date]:
+    with _conectar() as conn:
+        fila = conn.execute("SELECT MAX(fecha) FROM snapshot").fetchone()
+    return date.fromisoformat(fila[0]) if fila and fila[0] else None
+
+
+def ultimo_snapshot(equipo: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Filas del snapshot más reciente de cada equipo, con las mismas claves que devuelve
+    process_projects. Por equipo y no por fecha: un reporte de un solo equipo guarda
+    solo ese equipo, y los demás siguen con su última corrida, mientras no tenga más
+    de SNAPSHOT_EQUIPO_MAX_DIAS respecto del snapshot más reciente.
+    """
+    fecha = fecha_ultimo_snapshot()
+    if fecha is None:
+        return []
+    vigencia = (fecha - timedelta(days=SNAPSHOT_EQUIPO_MAX_DIAS)).isoformat()
+    where, params = _filtros(equipo, None, None)
+    sql = (
+        "SELECT s.* FROM snapshot s JOIN ("
+        "SELECT equipo, MAX(fecha) AS fecha FROM snapshot GROUP BY equipo HAVING MAX(fecha) >= ?"
+        ") u ON s.equipo = u.equipo AND s.fecha = u.fecha"
+        + "".join(f" AND {w}" for w in where)
+    )
+    with _conectar() as conn:
+        filas = conn.execute(sql, [vigencia] + params).fetchall()
+    return [_fila(f) for f in filas]
+
+
+def _fila(f: sqlite3.Row) -> Dict[str, Any]:
+    """Fila SQL → fila del reporte, solo con las ventanas configuradas hoy."""
+    rec = {"Equipo": f["equipo"], "Proyecto": f["proyecto"], "Version": f["version"]}
+    for k, col in COLUMNAS.items():
+        v = f[col]
+        if col.startswith("fecha_"):
+            v = date.fromisoformat(v) if v else None
+        elif col.startswith("tareas_") and v is not None:
+            v = int(v)
+        rec[k] = v
+    for k, v in json.loads(f["extra"] or "{}").items():
+        # Ventanas de snapshots guardados con otro REPORTE_VENTANAS
+        if k.startswith(("Tareas modificadas ", "Tareas cerradas ")) and k not in COLUMNAS_VENTANAS:
+            continue
+        rec[k] = v
+    return rec
+
+
+def tendencia(
+    metrica: str = "horas_insumidas",
+    semanas: int = 12,
+    equipo: Optional[str] = None,
+    proyecto: Optional[str] = None,
+    version: Optional[str] = None,
+    granularidad: str = "semana",
+) -> List[Dict[str, Any]]:
+    """
+    Serie temporal de `metrica` (suma sobre las versiones filtradas) para las últimas `semanas`.
+    ▸ granularidad="semana": un punto por semana, con el último snapshot de cada equipo en esa semana.
+    ▸ granularidad="dia": un punto por snapshot.
+    Los cortes se eligen después de filtrar: un equipo que no se corrió el último día
+    del período sigue sumando con su snapshot anterior.
+    """
+    # Solo hay serie de las ventanas con columna SQL que además estén configuradas hoy
+    disponibles = [col for col in COLUMNAS.values() if not col.startswith("fecha_")]
+    if metrica not in disponibles:
+        raise ValueError(
+            f"Métrica no disponible: {metrica}. Opciones: {', '.join(disponibles)}. "
+            "De las ventanas de REPORTE_VENTANAS solo semana y 30d tienen serie histórica"
+        )
+    if granularidad not in ("semana", "dia"):
+        raise ValueError("granularidad debe ser 'semana' o 'dia'")
+
+    desde = (date.today() - timedelta(weeks=semanas)).isoformat()
+    periodo = "strftime('%Y-%W', fecha)" if granularidad == "semana" else "fecha"
+    where, params = _filtros(equipo, proyecto, version)
+    sql = f"""
+        WITH filtradas AS (
+            SELECT * FROM snapshot s WHERE {" AND ".join(["s.fecha >= ?"] + where)}
+        ),
+        cortes AS (
+            SELECT {periodo} AS periodo, equipo, MAX(fecha) AS fecha
+            FROM filtradas GROUP BY periodo, equipo
+        )
+        SELECT c.periodo, MAX(c.fecha) AS fecha, SUM(f.{metrica}) AS valor, COUNT(*) AS versiones
+        FROM cortes c JOIN filtradas f ON f.equipo = c.equipo AND f.fecha = c.fecha
+        GROUP BY c.periodo
+        ORDER BY c.periodo
+    """
+    with _conectar() as conn:
+        filas = conn.execute(sql, [desde] + params).fetchall()
+    return [
+        {"periodo": f["periodo"], "fecha": f["fecha"], "valor": round(f["valor"] or 0, 2), "versiones": f["versiones"]}
+        for f in filas
+    ]
@@ -14,14 +14,19 @@ from pathlib import Path
 from dotenv import load_dotenv
 import logging
 import os
+import re
+import secrets
 
-from fastapi import FastAPI, BackgroundTasks
-from fastapi.responses import HTMLResponse
+from typing import Optional
+
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Header
+from fastapi.responses import HTMLResponse, StreamingResponse
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app.schemas import EmailRequest
 from app.services.report_service import generate_report
+from app.utils.profiling import perfilar, REPORT_PROFILE
 
 # ──────────────────────────────────────────────────────
 #  Cargar .env y configurar logging
@@ -44,7 +49,8 @@ def daily_master_job() -> None:
     logging.info("⏰ Iniciando job maestro diario")
     try:
         # generate_report recorre los equipos y envía según .env
-        generate_report(send_email=True, background_tasks=None)
+        with perfilar("daily_master_job", activo=REPORT_PROFILE):
+            generate_report(send_email=True, background_tasks=None)
         logging.info("✅ Job maestro completado")
     except Exception as exc:
         logging.exception("❌ Job maestro falló: %s", exc)
@@ -64,54 +70,147 @@ scheduler.start()
 # ──────────────────────────────────────────────────────
 #  Endpoints
 # ──────────────────────────────────────────────────────
+# Token para acciones de administración (p. ej. perfilar el reporte)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 @app.post("/generar-reporte", response_class=HTMLResponse)
-def generar_reporte(request: EmailRequest, background_tasks: BackgroundTasks):
+def generar_reporte(
+    request: EmailRequest,
+    background_tasks: BackgroundTasks,
+    perfil: bool = False,
+    x_admin_token: Optional[str] = Header(default=None),
+):
     """
     Lanza el reporte manualmente.
 
     Body JSON:
     {
       "send_email": true,
-      "destinatarios": "data" | "correo1,correo2" | null
+      "destinatarios": "data" | "correo1,correo2" | null,
+      "equipo": "data" | null
     }
+
+    Con `equipo` solo se consulta en Redmine el subárbol de ese equipo.
+
+    `?perfil=true` perfila la corrida (pstats en logs/); requiere el header
+    `X-Admin-Token` igual a ADMIN_TOKEN del .env.
     """
     logging.info("📥 Solicitud manual de reporte recibida")
-    return generate_report(
-        send_email=request.send_email,
-        destinatarios=request.destinatarios,
-        background_tasks=background_tasks,
-    )
+    if perfil and not (ADMIN_TOKEN and secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN)):
+        raise HTTPException(status_code=403, detail="El perfilado requiere un token de administrador")
+
+    with perfilar("generar_reporte", activo=perfil or REPORT_PROFILE):
+        return generate_report(
+            send_email=request.send_email,
+            destinatarios=request.destinatarios,
+            background_tasks=background_tasks,
+            equipo=request.equipo,
+        )
 
 @app.get("/", response_class=HTMLResponse)
-def vista_reporte():
+def vista_reporte(equipo: Optional[str] = None, accept_encoding: Optional[str] = Header(default=None)):
     """
     Devuelve el HTML completo del reporte, sin enviar correos.
-    Muestra todos los proyectos juntos (sin dividir por grupo).
-    """
-    from app.utils.redmine_client import get_projects, process_projects
-    from app.utils.file_manager import data_to_html
+    Muestra todos los proyectos juntos (sin dividir por grupo), o solo los de `?equipo=`.
 
-    try:
-        projects = get_projects()
-        data = process_projects(projects)
-
-        if not data:
-            return "<p>No se encontraron proyectos relevantes.</p>"
-
-        html = data_to_html(data)
+    La página se envía en streaming: el encabezado sale enseguida y la tabla de cada
+    equipo apenas se terminan de agregar sus proyectos (gzip si el cliente lo acepta).
+    """
+    from app.services.report_service import obtener_datos_por_equipo
+    from app.utils.file_manager import gzip_progresivo, iter_html_por_equipo
 
-        page = f"""
+    def pagina():
+        yield """
         <html>
         <head>
             <meta charset="utf-8">
             <title>Reporte de Proyectos (completo)</title>
         </head>
         <body style="margin: 24px; font-family: Arial, sans-serif;">
-        {html}
+        """
+        try:
+            yield from iter_html_por_equipo(obtener_datos_por_equipo(equipo=equipo))
+        except Exception as e:
+            # Los headers (200) ya se enviaron: el error se muestra dentro de la página
+            logging.exception("💥 Error al generar reporte: %s", e)
+            yield f"<p>Error al generar reporte: {e}</p>"
+        yield """
         </body>
         </html>
         """
-        return HTMLResponse(content=page)
 
-    except Exception as e:
-        return HTMLResponse(content=f"<p>Error al generar reporte: {e}</p>", status_code=500)
+    if "gzip" in (accept_encoding or "").lower():
+        return StreamingResponse(
+            gzip_progresivo(pagina()),
+            media_type="text/html; charset=utf-8",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return StreamingResponse(pagina(), media_type="text/html; charset=utf-8", headers={"Vary": "Accept-Encoding"})
+
+@app.get("/descargar/{filename}")
+def descargar(filename: str, equipo: Optional[str] = None, refrescar: bool = False):
+    """
+    Descarga el dataset del reporte en streaming. El formato sale de la extensión:
+    /descargar/reporte.csv, /descargar/reporte_data.xlsx?equipo=data
+
+    Usa el último snapshot guardado salvo que se pida `refrescar=true`.
+    """
+    from app.services.report_service import obtener_dataset
+    from app.utils.exportador import GENERADORES, MEDIA_TYPES
+
+    nombre = re.sub(r"[^\w.\-]", "_", Path(filename).name)
+    formato = Path(nombre).suffix.lstrip(".").lower()
+    if formato not in GENERADORES:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato or nombre}. Opciones: csv, xlsx")
+
+    data = obtener_dataset(equipo=equipo, refrescar=refrescar)
+    return StreamingResponse(
+        GENERADORES[formato](data),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+@app.get("/api/versions")
+def api_versions(
+    equipo: Optional[str] = None,
+    proyecto: Optional[str] = None,
+    version: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    limit: int = 50,
+    offset: int = 0,
+    refrescar: bool = False,
+):
+    """
+    Filas del reporte (una por versión) en JSON, desde el último snapshot indexado en memoria.
+
+    Ej.: /api/versions?equipo=data&sort=horas_consumidas&order=desc&limit=50
+    """
+    from app.services.consulta_service import obtener_indice
+
+    try:
+        return obtener_indice(refrescar=refrescar).consultar(equipo, proyecto, version, sort, order, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/tendencias")
+def api_tendencias(
+    metrica: str = "horas_insumidas",
+    semanas: int = 12,
+    equipo: Optional[str] = None,
+    proyecto: Optional[str] = None,
+    version: Optional[str] = None,
+    granularidad: str = "semana",
+):
+    """
+    Serie temporal de una métrica a partir de los snapshots diarios (sin consultar Redmine).
+
+    Ej.: /api/tendencias?metrica=horas_insumidas&semanas=12&equipo=data
+    """
+    from app.utils.snapshot_store import tendencia
+
+    try:
+        serie = tendencia(metrica, semanas, equipo, proyecto, version, granularidad)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"metrica": metrica, "granularidad": granularidad, "serie": serie}
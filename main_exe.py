@@ -38,9 +38,24 @@ def main():
     try:
         # Importamos el servicio principal de reporte
         from app.services.report_service import generate_report
+        from app.utils.profiling import perfilar, REPORT_PROFILE
+
+        # Perfilado opcional: --profile o REPORT_PROFILE=true en el .env
+        perfil = "--profile" in sys.argv[1:] or REPORT_PROFILE
+
+        # Reporte de un solo equipo: --equipo=data (solo se consulta su subárbol)
+        equipo = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--equipo=")), None)
+
+        # Sin mail: --sin-mail, y siempre al reproducir un cassette (los destinatarios están anonimizados)
+        from app.utils.redmine_cassette import REDMINE_CASSETTE_MODO
+        enviar = "--sin-mail" not in sys.argv[1:] and REDMINE_CASSETTE_MODO != "reproducir"
 
         # Ejecutamos el reporte (el envío de mail está embebido en esta función)
-        html_content = generate_report(send_email=True)
+        with perfilar("main_exe", activo=perfil) as resultado:
+            html_content = generate_report(send_email=enviar, equipo=equipo)
+
+        if perfil:
+            print("Perfil guardado en", resultado["archivo"])
 
         # Si no ocurre excepción, simplemente termina sin generar log.
         pass
@@ -0,0 +1,39 @@
+# tests/conftest.py
+import os
+
+# Los módulos de app/ validan las credenciales al importarse; en las pruebas nunca se usan
+os.environ.setdefault("REDMINE_URL", "http://redmine.test")
+os.environ.setdefault("REDMINE_API_KEY", "test")
+
+import pytest
+
+from tests.redmine_falso import organizacion, redmine_falso
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    """Caché, checkpoints y snapshots en un directorio temporal, sin miembros de grupos cacheados."""
+    from app.utils import cache_manager, checkpoint, gestor_mails, snapshot_store
+    from app.utils.cache_backend import BackendArchivos
+
+    cache_dir = tmp_path / "cache"
+    (cache_dir / "checkpoints").mkdir(parents=True)
+    monkeypatch.setattr(cache_manager, "BACKEND", BackendArchivos(str(cache_dir)))
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_DIR", str(cache_dir / "checkpoints"))
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DB", str(tmp_path / "snapshots.sqlite3"))
+    monkeypatch.setattr(gestor_mails, "_logins_cache", {})
+    return tmp_path
+
+
+@pytest.fixture
+def redmine(entorno, monkeypatch):
+    """
+    Redmine falso con la organización de prueba por defecto, usado por redmine_client y
+    gestor_mails. Para otra organización: `redmine.engine.org = organizacion(...)`.
+    """
+    from app.utils import gestor_mails, redmine_client
+
+    cliente = redmine_falso(organizacion())
+    monkeypatch.setattr(redmine_client, "redmine", cliente)
+    monkeypatch.setattr(gestor_mails, "redmine", cliente)
+    return cliente
@@ -0,0 +1,201 @@
+# tests/redmine_falso.py
+"""
+Redmine falso para las pruebas:
+  • organizacion(): organización de prueba de tamaño conocido (equipos → clientes → proyectos)
+  • MotorFalso: engine de redminelib que responde desde esa organización y registra
+    cada request por endpoint ("/issues.json", "/projects/:id.json", …)
+"""
+
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict
+
+from redminelib import Redmine, exceptions
+from redminelib.engines import BaseEngine
+
+ESTADOS_CERRADOS = (5, 6, 9, 21)
+
+# Grupos de Redmine que usa gestor_mails (gid → ids de usuario)
+GRUPOS = {53: [7, 8], 100: [8, 9], 128: [7], 45: [10]}
+
+
+def _fecha(dias: int) -> str:
+    return (date.today() - timedelta(days=dias)).isoformat()
+
+
+def _fecha_hora(dias: int) -> str:
+    return (datetime.combine(date.today(), datetime.min.time()) - timedelta(days=dias)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def organizacion(
+    equipos=("KZN DATA", "KZN DESARROLLO"),
+    clientes: int = 2,
+    proyectos: int = 3,
+    issues: int = 12,
+    padres_archivados: bool = False,
+) -> Dict[str, Any]:
+    """
+    Por cada equipo: `clientes` subproyectos con `proyectos` proyectos de `issues` tareas
+    cada uno, más un proyecto sin tareas. Se agrega un equipo ajeno ("Administración")
+    con la misma forma, que el reporte debe descartar sin consultar sus tareas.
+    Con `padres_archivados`, cada equipo tiene además un cliente archivado (fuera de
+    get_projects) con un proyecto activo debajo.
+    Cada proyecto con tareas tiene dos versiones: v0.0 (cerrada hace un año) y v1.0 (abierta).
+    """
+    projects, issues_, entries = [], [], []
+    versiones = {}
+    ids = iter(range(1, 10 ** 6))
+
+    def proyecto(nombre, padre=None, status=1):
+        p = {"id": next(ids), "name": nombre, "identifier": f"p{len(projects)}", "status": status,
+             "created_on": _fecha_hora(2000), "updated_on": _fecha_hora(5)}
+        if padre:
+            p["parent"] = {"id": padre["id"], "name": padre["name"]}
+        projects.append(p)
+        return p
+
+    def tareas(prj):
+        versiones[prj["id"]] = [
+            {"id": prj["id"] * 10, "name": "v0.0", "status": "closed", "sharing": "none",
+             "effective_date": _fecha(400), "updated_on": _fecha_hora(365), "project": {"id": prj["id"]}},
+            {"id": prj["id"] * 10 + 1, "name": "v1.0", "status": "open", "sharing": "none",
+             "effective_date": _fecha(-30), "updated_on": _fecha_hora(5), "project": {"id": prj["id"]}},
+        ]
+        for k in range(issues):
+            iid = next(ids)
+            st = [1, 2, 5, 6, 9, 21][k % 6]
+            issue = {
+                "id": iid, "project": {"id": prj["id"], "name": prj["name"]},
+                "status": {"id": st, "name": str(st)}, "subject": f"t{iid}",
+                "updated_on": _fecha_hora(k * 4), "created_on": _fecha_hora(200),
+                "estimated_hours": k * 1.5 if k % 3 else None,
+                "start_date": _fecha(100 - k), "due_date": _fecha(k * 3 - 20),
+                "spent_hours": 0.0,
+            }
+            if k % 4:
+                issue["fixed_version"] = {"id": prj["id"] * 10 + k % 2, "name": f"v{k % 2}.0"}
+            if st in ESTADOS_CERRADOS:
+                issue["closed_on"] = _fecha_hora(k * 3)
+            for j in range(k % 3):
+                horas = 0.5 + j
+                entries.append({
+                    "id": next(ids), "project": {"id": prj["id"], "name": prj["name"]}, "issue": {"id": iid},
+                    "hours": horas, "spent_on": _fecha(k * 20 + j),
+                })
+                issue["spent_hours"] += horas
+            issues_.append(issue)
+
+    for nombre in tuple(equipos) + ("Administración",):
+        raiz = proyecto(nombre)
+        for c in range(clientes):
+            cliente = proyecto(f"{nombre} - Cliente {c}", raiz)
+            for n in range(proyectos):
+                tareas(proyecto(f"{cliente['name']} - Proyecto {n}", cliente))
+        proyecto(f"{nombre} - Sin tareas", cliente)
+        if padres_archivados:
+            archivado = proyecto(f"{nombre} - Cliente archivado", raiz, status=5)
+            tareas(proyecto(f"{nombre} - Heredado", archivado))
+
+    usuarios = {u: {"id": u, "login": f"user{u}", "firstname": "U", "lastname": str(u)} for g in GRUPOS.values() for u in g}
+    return {"projects": projects, "issues": issues_, "time_entries": entries, "versions": versiones, "groups": GRUPOS, "users": usuarios}
+
+
+def proyectos_de_equipo(org: Dict[str, Any], con_tareas: bool = True, equipo: str = "KZN") -> int:
+    """Proyectos activos que el reporte debe procesar (nivel ≥ 2 bajo un equipo cuyo nombre empieza con `equipo`)."""
+    por_id = {p["id"]: p for p in org["projects"]}
+    con_issues = {i["project"]["id"] for i in org["issues"]}
+    total = 0
+    for p in org["projects"]:
+        padre = por_id.get(p.get("parent", {}).get("id"))
+        abuelo = por_id.get((padre or {}).get("parent", {}).get("id"))
+        if p["status"] == 1 and abuelo and abuelo["name"].startswith(equipo) and (not con_tareas or p["id"] in con_issues):
+            total += 1
+    return total
+
+
+class MotorFalso(BaseEngine):
+    """Responde desde `org` y cuenta las requests en `llamadas` por endpoint."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.org: Dict[str, Any] = {}
+        self.llamadas: Counter = Counter()
+
+    @staticmethod
+    def create_session(**params):
+        return None
+
+    def process_bulk_request(self, method, url, container, bulk_params):
+        return [r for params in bulk_params for r in self.request(method, url, params=params)[container]]
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        params = dict(params or {})
+        path = re.sub(r"^https?://[^/]+", "", url)
+        self.llamadas[re.sub(r"/\d+", "/:id", path)] += 1
+        org = self.org
+
+        m = re.fullmatch(r"/projects/(\d+)\.json", path)
+        if m:
+            for p in org["projects"]:
+                if p["id"] == int(m.group(1)):
+                    return {"project": p}
+            raise exceptions.ResourceNotFoundError
+        m = re.fullmatch(r"/projects/(\d+)/versions\.json", path)
+        if m:
+            versiones = org["versions"].get(int(m.group(1)), [])
+            return {"versions": [dict(v) for v in versiones], "total_count": len(versiones)}
+        m = re.fullmatch(r"/groups/(\d+)\.json", path)
+        if m:
+            gid = int(m.group(1))
+            return {"group": {"id": gid, "name": f"g{gid}", "users": [{"id": u, "name": str(u)} for u in org["groups"].get(gid, [])]}}
+        m = re.fullmatch(r"/users/(\d+)\.json", path)
+        if m:
+            return {"user": org["users"][int(m.group(1))]}
+
+        if path == "/projects.json":
+            return self._pagina("projects", org["projects"], params)
+        if path == "/issues.json":
+            filas = [i for i in org["issues"] if "project_id" not in params or i["project"]["id"] == int(params["project_id"])]
+            if params.get("status_id") != "*":
+                filas = [i for i in filas if i["status"]["id"] not in ESTADOS_CERRADOS]
+            if "fixed_version_id" in params:
+                # Sintaxis corta de Redmine: "a|b" (alguna de esas versiones) o "!a|b" (ninguna, incluye sin versión)
+                valor = str(params["fixed_version_id"])
+                ids = {int(v) for v in valor.lstrip("!").split("|")}
+                version = lambda i: (i.get("fixed_version") or {}).get("id")
+                filas = [i for i in filas if (version(i) in ids) != valor.startswith("!")]
+            if params.get("sort") == "updated_on:desc":
+                filas = sorted(filas, key=lambda i: i["updated_on"], reverse=True)
+            return self._pagina("issues", filas, params)
+        if path == "/time_entries.json":
+            # Proyectos donde el usuario ve las tareas pero no las horas
+            if int(params.get("project_id", 0)) in org.get("horas_prohibidas", ()):
+                raise exceptions.ForbiddenError
+            filas = [e for e in org["time_entries"] if "project_id" not in params or e["project"]["id"] == int(params["project_id"])]
+            # redminelib traduce from_date / to_date a los parámetros "from" / "to" de la API
+            if "from" in params:
+                filas = [e for e in filas if e["spent_on"] >= str(params["from"])]
+            if "to" in params:
+                filas = [e for e in filas if e["spent_on"] <= str(params["to"])]
+            return self._pagina("time_entries", sorted(filas, key=lambda e: e["spent_on"], reverse=True), params)
+        if path == "/users.json":
+            filas = list(org["users"].values())
+            if "group_id" in params:
+                filas = [org["users"][u] for u in org["groups"].get(int(params["group_id"]), [])]
+            return self._pagina("users", filas, params)
+        raise exceptions.ResourceNotFoundError
+
+    @staticmethod
+    def _pagina(contenedor, filas, params):
+        # Como Redmine: 25 por defecto y nunca más de 100 por página
+        limit = min(int(params.get("limit") or 25), 100)
+        offset = int(params.get("offset") or 0)
+        return {contenedor: [dict(f) for f in filas[offset:offset + limit]], "total_count": len(filas), "limit": limit, "offset": offset}
+
+
+def redmine_falso(org: Dict[str, Any]) -> Redmine:
+    """Cliente Redmine servido por MotorFalso; las llamadas quedan en `cliente.engine.llamadas`."""
+    cliente = Redmine("http://redmine.test", key="test", engine=MotorFalso)
+    cliente.engine.org = org
+    return cliente
@@ -0,0 +1,72 @@
+# tests/test_backfill.py
+from datetime import date
+
+from app.utils import backfill, cache_manager, redmine_client
+from tests.redmine_falso import organizacion
+
+
+def _ids_por_proyecto(org):
+    ids = {}
+    for e in org["time_entries"]:
+        ids.setdefault(e["project"]["id"], []).append(e["id"])
+    return {pid: sorted(v) for pid, v in ids.items()}
+
+
+def test_rangos_de_fechas_cubren_todo_el_historico():
+    rangos = backfill.rangos_de_fechas(date(2024, 1, 1), date(2024, 3, 15), 30)
+
+    assert rangos == [
+        (None, date(2024, 1, 30)),
+        (date(2024, 1, 31), date(2024, 2, 29)),
+        (date(2024, 3, 1), None),
+    ]
+
+
+def test_backfill_escribe_el_historico_completo(redmine):
+    # 150 tareas por proyecto → ~150 time entries en ~8 años: varias páginas y rangos
+    redmine.engine.org = organizacion(equipos=("KZN DATA",), clientes=1, proyectos=2, issues=150)
+    esperado = _ids_por_proyecto(redmine.engine.org)
+
+    proyectos = redmine_client.get_projects()
+
+    guardados = backfill.backfill(proyectos, workers=3, dias=365)
+
+    # Los proyectos sin horas también quedan con shard (vacío), así el reporte no los vuelve a pedir
+    assert set(guardados) == {p.id for p in proyectos}
+    for pid in guardados:
+        shard = cache_manager._load_shard(cache_manager._clave(pid))
+        assert [e["id"] for e in shard] == esperado.get(pid, [])
+
+
+def test_backfill_proyectos_chicos_una_request(redmine):
+    proyectos = redmine_client.get_projects()
+    redmine.engine.llamadas.clear()
+
+    backfill.backfill(proyectos, workers=2)
+
+    assert redmine.engine.llamadas == {"/time_entries.json": len(proyectos)}
+
+
+def test_backfill_saltea_shards_existentes(redmine):
+    proyectos = redmine_client.get_projects()
+    backfill.backfill(proyectos)
+    redmine.engine.llamadas.clear()
+
+    assert backfill.backfill(proyectos) == {}
+    assert not redmine.engine.llamadas
+
+
+def test_backfill_no_pisa_el_shard_de_una_corrida_concurrente(redmine, monkeypatch):
+    proyectos = redmine_client.get_projects()
+    primera_pagina = backfill._primera_pagina
+
+    # Mientras el backfill descarga, el reporte sincroniza el proyecto y guarda su shard
+    def con_corrida_concurrente(pid):
+        resultado = primera_pagina(pid)
+        cache_manager._save_shard(cache_manager._clave(pid), [{"id": -pid}])
+        return resultado
+
+    monkeypatch.setattr(backfill, "_primera_pagina", con_corrida_concurrente)
+
+    assert backfill.backfill(proyectos) == {}
+    assert all(cache_manager._load_shard(cache_manager._clave(p.id)) == [{"id": -p.id}] for p in proyectos)
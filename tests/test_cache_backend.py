@@ -0,0 +1,153 @@
+# tests/test_cache_backend.py
+import os
+import threading
+import time
+
+import pytest
+
+from app.utils import cache_manager, redmine_client
+from app.utils.cache_backend import BackendArchivos, BackendRedis, BackendSQLite, RedisEnMemoria
+
+
+@pytest.fixture(params=["archivos", "sqlite", "memoria"])
+def backend(request, tmp_path):
+    if request.param == "archivos":
+        return BackendArchivos(str(tmp_path / "cache"))
+    if request.param == "sqlite":
+        return BackendSQLite(str(tmp_path / "cache.sqlite3"))
+    return BackendRedis(cliente=RedisEnMemoria())
+
+
+def test_leer_escribir_listar_borrar(backend):
+    assert backend.leer("time_entries_1") is None
+
+    backend.escribir("time_entries_1", b"uno")
+    backend.escribir("time_entries_2", b"dos!")
+    backend.escribir("project_state", b"estado")
+
+    assert backend.leer("time_entries_1") == b"uno"
+    assert backend.existe("time_entries_2")
+    assert {(s["clave"], s["bytes"]) for s in backend.listar("time_entries_")} == {("time_entries_1", 3), ("time_entries_2", 4)}
+
+    backend.borrar("time_entries_1")
+    assert not backend.existe("time_entries_1")
+    assert [s["clave"] for s in backend.listar("time_entries_")] == ["time_entries_2"]
+
+
+def test_bloqueo_exclusivo_entre_hilos(backend):
+    dentro, maximo = [0], [0]
+    mutex = threading.Lock()
+
+    def trabajo():
+        with backend.bloqueo("time_entries_1", ttl=5) as obtenido:
+            assert obtenido
+            with mutex:
+                dentro[0] += 1
+                maximo[0] = max(maximo[0], dentro[0])
+            time.sleep(0.02)
+            with mutex:
+                dentro[0] -= 1
+
+    hilos = [threading.Thread(target=trabajo) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert maximo[0] == 1
+    # Un lock vencido no bloquea a los demás
+    assert backend._tomar("time_entries_2", "a", ttl=0.01)
+    time.sleep(0.05)
+    with backend.bloqueo("time_entries_2", ttl=1) as obtenido:
+        assert obtenido
+
+
+def test_nodos_concurrentes_descargan_una_sola_vez(backend, redmine, monkeypatch):
+    monkeypatch.setattr(cache_manager, "BACKEND", backend)
+    pid = next(p.id for p in redmine_client.get_projects() if p.name.endswith("Proyecto 0"))
+    redmine.engine.llamadas.clear()
+    resultados = []
+    largada = threading.Barrier(3)
+
+    # Redmine lento: los tres nodos piden el proyecto mientras el primero todavía descarga
+    request = redmine.engine.request
+
+    def lento(*args, **kwargs):
+        time.sleep(0.2)
+        return request(*args, **kwargs)
+
+    monkeypatch.setattr(redmine.engine, "request", lento)
+
+    def nodo():
+        largada.wait()
+        resultados.append(len(cache_manager.get_cached_time_entries(redmine, pid)))
+
+    hilos = [threading.Thread(target=nodo) for _ in range(3)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert len(set(resultados)) == 1 and resultados[0] > 0
+    assert redmine.engine.llamadas == {"/time_entries.json": 1}
+
+
+def test_estado_de_proyectos_en_el_backend(backend, monkeypatch):
+    monkeypatch.setattr(cache_manager, "BACKEND", backend)
+    estado = {1: {"agregado": cache_manager.datetime.today().date(), "huella": (1, 2)}}
+
+    cache_manager.save_project_state(estado)
+
+    assert cache_manager.load_project_state() == estado
+
+
+def test_lock_renovado_mientras_se_usa(backend):
+    with backend.bloqueo("time_entries_1", ttl=0.3) as obtenido:
+        assert obtenido
+        time.sleep(0.8)
+        assert not backend._tomar("time_entries_1", "otro", ttl=5)
+
+    assert backend._tomar("time_entries_1", "otro", ttl=5)
+
+
+def test_lock_ilegible_vence_por_fecha_del_archivo(tmp_path):
+    backend = BackendArchivos(str(tmp_path / "cache"))
+    ruta = backend._ruta_lock("time_entries_1")
+    open(ruta, "w").close()
+
+    assert not backend._tomar("time_entries_1", "a", ttl=60)
+
+    viejo = time.time() - 120
+    os.utime(ruta, (viejo, viejo))
+    assert not backend._tomar("time_entries_1", "a", ttl=60)  # lo libera
+    assert backend._tomar("time_entries_1", "a", ttl=60)
+
+
+def test_solo_el_dueno_renueva_o_suelta_el_lock(backend):
+    assert backend._tomar("time_entries_1", "a", ttl=5)
+
+    backend._soltar("time_entries_1", "b")
+    assert not backend._renovar("time_entries_1", "b", ttl=5)
+    assert not backend._tomar("time_entries_1", "c", ttl=5)
+
+    assert backend._renovar("time_entries_1", "a", ttl=5)
+    backend._soltar("time_entries_1", "a")
+    assert backend._tomar("time_entries_1", "c", ttl=5)
+
+
+def test_limpieza_de_lock_vencido_no_borra_uno_nuevo(tmp_path):
+    backend = BackendArchivos(str(tmp_path / "cache"))
+    ruta = backend._ruta_lock("time_entries_1")
+    assert backend._tomar("time_entries_1", "muerto", ttl=0.01)
+    antes = os.stat(ruta)
+    with open(ruta) as f:
+        vencido = f.read()
+
+    # Entre la lectura y el borrado, otro nodo limpió el vencido y tomó uno nuevo
+    os.remove(ruta)
+    assert backend._tomar("time_entries_1", "vivo", ttl=60)
+    backend._descartar_vencido(ruta, "tercero", antes, vencido)
+
+    with open(ruta) as f:
+        assert f.read().split()[0] == "vivo"
+    assert os.listdir(backend.dir) == [os.path.basename(ruta)]
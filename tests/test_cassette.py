@@ -0,0 +1,103 @@
+# tests/test_cassette.py
+import gzip
+
+import pytest
+from redminelib import Redmine, exceptions
+
+from app.utils import redmine_client
+from app.utils.redmine_cassette import Cassette, Grabador, Reproductor, RequestNoGrabada, clave_request
+from app.utils.redmine_governor import GobernadorRedmine
+from tests.redmine_falso import MotorFalso
+
+
+@pytest.fixture
+def grabar(redmine, monkeypatch):
+    """Cliente que graba lo que responde el Redmine falso; devuelve el cassette."""
+    cinta = Cassette()
+    grabador = type("GrabadorFalso", (Grabador, MotorFalso), {"grabacion": cinta})
+    cliente = Redmine("http://redmine.test", key="test", engine=grabador)
+    cliente.engine.org = redmine.engine.org
+    monkeypatch.setattr(redmine_client, "redmine", cliente)
+    return cinta
+
+
+def _reproducir(monkeypatch, cinta, latencia=0.0):
+    motor = type("ReproductorPrueba", (Reproductor,), {
+        "cinta": cinta, "latencia": latencia, "gobernador": GobernadorRedmine(rps=0, concurrencia_max=4),
+    })
+    cliente = Redmine("http://redmine.test", key="test", engine=motor)
+    monkeypatch.setattr(redmine_client, "redmine", cliente)
+    return cliente
+
+
+def test_reproduce_la_corrida_grabada(grabar, tmp_path, monkeypatch):
+    grabado = redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+    path = str(tmp_path / "redmine.json.gz")
+    grabar.guardar(path, anonimizar=False)
+
+    _reproducir(monkeypatch, Cassette.cargar(path))
+    reproducido = redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+
+    assert reproducido == grabado
+
+
+def test_anonimiza_conservando_equipos_y_metricas(grabar, tmp_path, monkeypatch):
+    grabado = redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+    path = str(tmp_path / "redmine.json.gz")
+    grabar.guardar(path)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        contenido = f.read()
+    assert "Cliente" not in contenido and "KZN DATA" in contenido
+
+    _reproducir(monkeypatch, Cassette.cargar(path))
+    reproducido = redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+
+    sin_nombres = lambda filas: sorted(sorted((k, v) for k, v in f.items() if k not in ("Proyecto", "Version")) for f in filas)
+    assert sin_nombres(reproducido) == sin_nombres(grabado)
+    assert {f["Equipo"] for f in reproducido} == {"KZN DATA", "KZN DESARROLLO"}
+
+
+def test_errores_y_requests_faltantes(grabar, monkeypatch):
+    with pytest.raises(exceptions.ResourceNotFoundError):
+        redmine_client.redmine.project.get(999999)
+
+    cliente = _reproducir(monkeypatch, grabar)
+
+    with pytest.raises(exceptions.ResourceNotFoundError):
+        cliente.project.get(999999)
+    with pytest.raises(RequestNoGrabada):
+        cliente.project.get(1)
+
+
+def test_clave_normaliza_fechas():
+    assert clave_request("get", "http://x/time_entries.json", {"project_id": 3, "from": "2024-01-31"}) == \
+        clave_request("GET", "https://y/time_entries.json", {"from": "2025-06-01", "project_id": "3"})
+
+
+def test_reproducir_no_escribe_en_la_cache_ni_en_los_snapshots_reales(grabar, entorno, tmp_path, monkeypatch):
+    from app.services import report_service
+    from app.utils import cache_manager, checkpoint, redmine_cassette, snapshot_store
+
+    path = str(tmp_path / "redmine.json.gz")
+    list(report_service.obtener_datos_por_equipo())
+    grabar.guardar(path)
+    reales = (cache_manager.BACKEND, checkpoint.CHECKPOINT_DIR, snapshot_store.SNAPSHOT_DB)
+    antes = sorted(p.name for p in (entorno / "cache").iterdir())
+    snapshots = snapshot_store.ultimo_snapshot()
+    assert snapshots
+    for var in ("SNAPSHOT_DB", "CACHE_DIR", "CACHE_BACKEND"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(redmine_cassette, "_reproduccion_aislada", False)
+    monkeypatch.setattr(redmine_cassette.tempfile, "tempdir", str(tmp_path))
+
+    motor = redmine_cassette.motor_segun_modo("reproducir", path, "0")
+    cliente = Redmine("http://redmine.test", key="test", engine=motor)
+    monkeypatch.setattr(redmine_client, "redmine", cliente)
+    list(report_service.obtener_datos_por_equipo())
+
+    aislados = (cache_manager.BACKEND, checkpoint.CHECKPOINT_DIR, snapshot_store.SNAPSHOT_DB)
+    assert all(a is not r and a != r for a, r in zip(aislados, reales))
+    assert sorted(p.name for p in (entorno / "cache").iterdir()) == antes
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DB", reales[2])
+    assert snapshot_store.ultimo_snapshot() == snapshots
@@ -0,0 +1,27 @@
+# tests/test_checkpoint.py
+import os
+
+from app.utils import checkpoint
+
+
+def test_corte_dentro_del_ultimo_registro(entorno):
+    filas = [{"Proyecto": "P", "Version": f"v{n}", "Horas insumidas": n * 1.5} for n in range(5)]
+    for pid in (1, 2, 3):
+        checkpoint.guardar_en_checkpoint("corrida", pid, filas, None)
+    path = checkpoint._ruta("corrida")
+    with open(path, "rb") as f:
+        completo = f.read()
+    checkpoint.guardar_en_checkpoint("otra", 1, filas, None)
+    checkpoint.guardar_en_checkpoint("otra", 2, filas, None)
+    inicio_ultimo = os.path.getsize(checkpoint._ruta("otra"))
+
+    # Cualquier punto de corte, incluidos los primeros bytes del registro (EOFError al leer)
+    for corte in range(inicio_ultimo + 1, len(completo)):
+        with open(path, "wb") as f:
+            f.write(completo[:corte])
+
+        assert set(checkpoint.cargar_checkpoint("corrida")) == {1, 2}
+        assert os.path.getsize(path) == inicio_ultimo
+
+        checkpoint.guardar_en_checkpoint("corrida", 4, filas, None)
+        assert set(checkpoint.cargar_checkpoint("corrida")) == {1, 2, 4}
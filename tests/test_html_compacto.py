@@ -0,0 +1,85 @@
+# tests/test_html_compacto.py
+import logging
+from html.parser import HTMLParser
+
+import pytest
+
+from app.services import report_service
+from app.utils import file_manager
+
+
+class _Tablas(HTMLParser):
+    """Texto de las celdas de cada fila de datos (sin separadores ni encabezados), por equipo."""
+
+    def __init__(self):
+        super().__init__()
+        self.filas, self._fila, self._celda, self._equipo, self._en_h3 = [], None, None, None, False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "h3":
+            self._en_h3, self._equipo = True, ""
+        elif tag == "tr":
+            self._fila = []
+        elif tag == "td" and self._fila is not None:
+            self._celda = ""
+
+    def handle_endtag(self, tag):
+        if tag == "h3":
+            self._en_h3 = False
+        elif tag == "td" and self._celda is not None:
+            self._fila.append(self._celda.strip())
+            self._celda = None
+        elif tag == "tr" and self._fila is not None:
+            if len(self._fila) > 1:
+                self.filas.append((self._equipo, tuple(self._fila)))
+            self._fila = None
+
+    def handle_data(self, data):
+        if self._en_h3:
+            self._equipo += data
+        elif self._celda is not None:
+            self._celda += data
+
+
+def _filas(html):
+    p = _Tablas()
+    p.feed(html)
+    return p.filas
+
+
+@pytest.fixture
+def filas(redmine, monkeypatch):
+    monkeypatch.setattr(file_manager, "generar_fecha_reporte", lambda: "2024/05/15 10:00:00")
+    return report_service.obtener_datos()
+
+
+def test_compacto_muestra_las_mismas_filas(filas):
+    normal = file_manager.data_to_html(filas)
+    compacto = file_manager.data_to_html(filas, compacto=True)
+
+    assert _filas(compacto) == _filas(normal)
+    assert len(_filas(compacto)) == len(filas)
+    assert file_manager.tamano_html(compacto) < file_manager.tamano_html(normal)
+
+
+def test_partes_respetan_el_limite_sin_cortar_proyectos(filas):
+    completo = _filas(file_manager.data_to_html(filas, compacto=True))
+    max_bytes = file_manager.tamano_html(file_manager.data_to_html(filas, compacto=True)) // 3
+
+    partes = file_manager.data_to_html_partes(filas, max_bytes)
+
+    assert len(partes) > 2
+    assert all(file_manager.tamano_html(p) <= max_bytes for p in partes)
+    assert [f for p in partes for f in _filas(p)] == completo
+    proyectos = [{(eq, f[0]) for eq, f in _filas(p)} for p in partes]
+    assert sum(len(p) for p in proyectos) == len(set().union(*proyectos))
+
+
+def test_proyecto_mas_grande_que_el_limite_va_solo_y_avisa(filas, caplog):
+    with caplog.at_level(logging.WARNING):
+        partes = file_manager.data_to_html_partes(filas, max_bytes=1024)
+
+    proyectos = {(r["Equipo"], r["Proyecto"]) for r in filas}
+    assert len(partes) == len(proyectos)
+    assert all(len({f[0] for _, f in _filas(p)}) == 1 for p in partes)
+    assert sum("supera el límite" in r.getMessage() for r in caplog.records) == len(proyectos)
@@ -0,0 +1,26 @@
+# tests/test_html_progresivo.py
+import zlib
+
+from app.services import report_service
+from app.utils import file_manager
+
+
+def test_html_progresivo_igual_al_completo(redmine, monkeypatch):
+    monkeypatch.setattr(file_manager, "generar_fecha_reporte", lambda: "2024/05/15 10:00:00")
+    grupos = list(report_service.obtener_datos_por_equipo())
+    filas = [f for _, fs in grupos for f in fs]
+
+    partes = list(file_manager.iter_html_por_equipo(grupos))
+
+    assert len(partes) == len(grupos) + 2  # encabezado + un equipo por parte + cierre
+    assert "".join(partes) == file_manager.data_to_html(filas)
+
+
+def test_gzip_progresivo_cada_parte_se_puede_descomprimir_al_llegar():
+    partes = ["<div>", "<table>equipo 1</table>" * 50, "<table>equipo 2</table>", "</div>"]
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    recibido = [d.decompress(bloque).decode() for bloque in file_manager.gzip_progresivo(partes)]
+
+    assert recibido[:len(partes)] == partes
+    assert "".join(recibido) == "".join(partes)
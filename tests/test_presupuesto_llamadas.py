@@ -0,0 +1,174 @@
+# tests/test_presupuesto_llamadas.py
+"""
+Presupuesto de requests a Redmine por operación. Si un cambio agrega consultas por
+proyecto (N+1), estas pruebas fallan en las organizaciones grandes.
+"""
+
+import math
+
+import pytest
+
+from app.services import report_service
+from app.utils import gestor_mails, redmine_client
+from tests.redmine_falso import GRUPOS, organizacion, proyectos_de_equipo
+
+# Requests por proyecto de equipo, según el tipo de corrida
+POR_PROYECTO_FRIO = 3          # huella (1 issue + 1 time entry) + página de issues
+POR_PROYECTO_SIN_CAMBIOS = 2   # solo la huella
+POR_PROYECTO_COMPLETO = 2      # sondeo de 1 issue + página de issues (sin incremental)
+
+ORGANIZACIONES = {
+    "chica": dict(clientes=2, proyectos=3),
+    "grande": dict(equipos=("KZN DATA", "KZN DESARROLLO", "KZN TECNOLOGIA"), clientes=6, proyectos=20),
+}
+
+
+@pytest.fixture(params=sorted(ORGANIZACIONES))
+def org(request, redmine):
+    redmine.engine.org = organizacion(**ORGANIZACIONES[request.param])
+    return redmine.engine.org
+
+
+def _paginas_proyectos(org):
+    return math.ceil(len(org["projects"]) / 100)
+
+
+def test_get_projects_pagina_una_vez(org, redmine):
+    proyectos = redmine_client.get_projects()
+
+    assert len(proyectos) == sum(1 for p in org["projects"] if p["status"] == 1)
+    assert redmine.engine.llamadas == {"/projects.json": _paginas_proyectos(org)}
+
+
+def test_process_projects_en_frio(org, redmine):
+    data = redmine_client.process_projects(redmine_client.get_projects(), incremental=True)
+    llamadas = redmine.engine.llamadas
+
+    assert data
+    assert llamadas["/projects/:id.json"] == 0
+    assert sum(llamadas.values()) - llamadas["/projects.json"] <= POR_PROYECTO_FRIO * proyectos_de_equipo(org, con_tareas=False)
+
+
+def test_process_projects_sin_cambios(org, redmine):
+    proyectos = redmine_client.get_projects()
+    primera = redmine_client.process_projects(proyectos, incremental=True)
+    redmine.engine.llamadas.clear()
+
+    segunda = redmine_client.process_projects(proyectos, incremental=True)
+
+    assert segunda == primera
+    assert sum(redmine.engine.llamadas.values()) <= POR_PROYECTO_SIN_CAMBIOS * proyectos_de_equipo(org, con_tareas=False)
+
+
+def test_process_projects_completo(org, redmine):
+    redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+    llamadas = redmine.engine.llamadas
+
+    assert llamadas["/time_entries.json"] == 0
+    assert sum(llamadas.values()) - llamadas["/projects.json"] <= POR_PROYECTO_COMPLETO * proyectos_de_equipo(org, con_tareas=False)
+
+
+def test_proyectos_ajenos_no_consultan_tareas(redmine):
+    redmine.engine.org = organizacion(equipos=())
+
+    assert redmine_client.process_projects(redmine_client.get_projects()) == []
+    assert redmine.engine.llamadas == {"/projects.json": 1}
+
+
+def test_padres_fuera_del_listado_se_piden_una_vez(redmine):
+    redmine.engine.org = organizacion(padres_archivados=True)
+    archivados = sum(1 for p in redmine.engine.org["projects"] if p["status"] != 1)
+
+    data = redmine_client.process_projects(redmine_client.get_projects())
+
+    assert any(r["Proyecto"].endswith("Heredado") for r in data)
+    assert redmine.engine.llamadas["/projects/:id.json"] == archivados
+
+
+def test_padres_con_subproyectos_conservan_su_nombre_sin_requests(redmine):
+    org = redmine.engine.org
+    padre = next(p for p in org["projects"] if p["name"].endswith("Cliente 0 - Proyecto 0"))
+    org["projects"].append({**padre, "id": 999, "name": "Subproyecto", "identifier": "sub",
+                            "parent": {"id": padre["id"], "name": padre["name"]}})
+
+    data = redmine_client.process_projects(redmine_client.get_projects())
+
+    assert any(r["Proyecto"] == padre["name"] for r in data)
+    assert not any(r["Proyecto"] == "" for r in data)
+    assert redmine.engine.llamadas["/projects/:id.json"] == 0
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_proyectos_sin_permiso_de_horas(org, redmine, incremental):
+    org["horas_prohibidas"] = {p["id"] for p in org["projects"]}
+    esperado = redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+    redmine.engine.llamadas.clear()
+
+    data = redmine_client.process_projects(redmine_client.get_projects(), incremental=incremental)
+    llamadas = redmine.engine.llamadas
+
+    assert len(data) == len(esperado) > 0
+    assert sum(llamadas.values()) - llamadas["/projects.json"] <= POR_PROYECTO_FRIO * proyectos_de_equipo(org, con_tareas=False)
+
+    if incremental:
+        redmine.engine.llamadas.clear()
+        assert redmine_client.process_projects(redmine_client.get_projects(), incremental=True) == data
+        llamadas = redmine.engine.llamadas
+        assert sum(llamadas.values()) - llamadas["/projects.json"] <= POR_PROYECTO_SIN_CAMBIOS * proyectos_de_equipo(org, con_tareas=False)
+
+
+def test_destinatarios_una_consulta_por_grupo(redmine, monkeypatch):
+    monkeypatch.setenv("EMAIL_DATA", "data")
+    monkeypatch.setenv("EMAIL_DESARROLLO", "desarrollo, jefe@cliente.com")
+    monkeypatch.setenv("EMAIL_CONSULTORIA", "consultoria")
+
+    for _ in range(3):
+        data = gestor_mails.destinatarios_equipo("data")
+        desarrollo = gestor_mails.destinatarios_equipo("desarrollo")
+        gestor_mails.destinatarios_equipo("consultoria")
+
+    dominio = gestor_mails.MAIL_DOMAIN
+    assert data == [f"user8{dominio}", f"user9{dominio}"]
+    assert desarrollo == sorted(["jefe@cliente.com", f"user7{dominio}", f"user8{dominio}"])
+    assert redmine.engine.llamadas == {"/users.json": len(GRUPOS)}
+
+
+def test_generate_report(org, redmine, monkeypatch):
+    monkeypatch.setenv("EMAIL_DATA", "data")
+    monkeypatch.setenv("EMAIL_DESARROLLO", "desarrollo")
+
+    resultado = report_service.generate_report(send_email=False)
+    llamadas = redmine.engine.llamadas
+
+    assert resultado == "Reportes generados para 2 equipos"
+    assert llamadas["/groups/:id.json"] == llamadas["/users/:id.json"] == 0
+    assert sum(llamadas.values()) <= (
+        _paginas_proyectos(org)
+        + POR_PROYECTO_FRIO * proyectos_de_equipo(org, con_tareas=False)
+        + len(GRUPOS)
+    )
+
+
+def test_generate_report_de_un_equipo(org, redmine, monkeypatch):
+    monkeypatch.setenv("EMAIL_DATA", "data")
+
+    resultado = report_service.generate_report(send_email=False, equipo="data")
+    llamadas = redmine.engine.llamadas
+
+    assert resultado == "Reportes generados para 1 equipos"
+    assert sum(llamadas.values()) <= (
+        _paginas_proyectos(org)
+        + POR_PROYECTO_FRIO * proyectos_de_equipo(org, con_tareas=False, equipo="KZN DATA")
+        + len(GRUPOS)
+    )
+
+
+def test_reporte_de_un_equipo_conserva_el_estado_del_resto(org, redmine):
+    proyectos = redmine_client.get_projects()
+    redmine_client.process_projects(proyectos, incremental=True)
+    report_service.obtener_datos(equipo="data")
+    redmine.engine.llamadas.clear()
+
+    redmine_client.process_projects(proyectos, incremental=True)
+
+    assert sum(redmine.engine.llamadas.values()) <= POR_PROYECTO_SIN_CAMBIOS * proyectos_de_equipo(org, con_tareas=False)
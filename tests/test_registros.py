@@ -0,0 +1,20 @@
+# tests/test_registros.py
+from app.utils import redmine_client
+from app.utils.registros import fecha_hora
+
+
+def test_fecha_hora_con_otros_formatos():
+    assert fecha_hora("2024-05-01T13:45:00Z") == "2024-05-01 13:45:00"
+    assert fecha_hora("2024-05-01T13:45:00.123Z") == "2024-05-01T13:45:00.123Z"
+    assert fecha_hora("2024-05-01T13:45:00+02:00") == "2024-05-01T13:45:00+02:00"
+    assert fecha_hora(None) == ""
+
+
+def test_huella_con_fracciones_de_segundo(redmine):
+    for issue in redmine.engine.org["issues"]:
+        issue["updated_on"] = issue["updated_on"].replace("Z", ".250Z")
+
+    data = redmine_client.process_projects(redmine_client.get_projects(), incremental=True)
+
+    assert data
+    assert redmine_client.process_projects(redmine_client.get_projects(), incremental=True) == data
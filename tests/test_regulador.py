@@ -0,0 +1,83 @@
+# tests/test_regulador.py
+import json
+
+import pytest
+import requests
+from redminelib import Redmine, exceptions
+
+from app.utils import redmine_governor
+from app.utils.redmine_governor import GobernadorRedmine, MotorGobernado
+
+
+def _respuesta(status, cuerpo=None, **headers):
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers)
+    r._content = json.dumps(cuerpo or {}).encode()
+    return r
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Esperas pedidas por el regulador, sin dormir de verdad."""
+    pedidas = []
+    monkeypatch.setattr(redmine_governor.time, "sleep", pedidas.append)
+    return pedidas
+
+
+def _cliente(respuestas, max_reintentos=3):
+    """Cliente gobernado cuya sesión HTTP responde en orden con `respuestas`; las requests quedan en `enviadas`."""
+    gobernador = GobernadorRedmine(rps=0, max_reintentos=max_reintentos, backoff_base=0.01, backoff_max=0.02, concurrencia_max=4)
+    cliente = Redmine("http://redmine.test", key="test", engine=type("MotorPrueba", (MotorGobernado,), {"gobernador": gobernador}))
+    cola = list(respuestas)
+    cliente.enviadas = []
+
+    def enviar(method, url, **kwargs):
+        cliente.enviadas.append(method.upper())
+        return cola.pop(0) if len(cola) > 1 else cola[0]
+
+    cliente.engine.session.request = enviar
+    return cliente
+
+
+def test_429_respeta_retry_after_y_reintenta(esperas):
+    cliente = _cliente([_respuesta(429, **{"Retry-After": "7"}), _respuesta(200, {"ok": 1})])
+
+    assert cliente.engine.request("post", "http://redmine.test/issues.json") == {"ok": 1}
+    assert cliente.enviadas == ["POST", "POST"]
+    assert esperas == [7.0]
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+def test_5xx_se_reintenta_solo_en_lecturas(esperas, status):
+    lectura = _cliente([_respuesta(status), _respuesta(200, {"issues": []})])
+    assert lectura.engine.request("get", "http://redmine.test/issues.json") == {"issues": []}
+    assert lectura.enviadas == ["GET", "GET"]
+    assert len(esperas) == 1 and 0 <= esperas[0] <= 0.02
+
+    for metodo in ("post", "put"):
+        escritura = _cliente([_respuesta(status), _respuesta(200, {"ok": 1})])
+        with pytest.raises((exceptions.ServerError, exceptions.UnknownError)):
+            escritura.engine.request(metodo, "http://redmine.test/issues/1.json")
+        assert escritura.enviadas == [metodo.upper()]
+
+
+def test_server_error_llega_al_llamador_al_agotar_reintentos(esperas):
+    cliente = _cliente([_respuesta(500)], max_reintentos=3)
+
+    with pytest.raises(exceptions.ServerError):
+        cliente.engine.request("get", "http://redmine.test/issues.json")
+    assert cliente.enviadas == ["GET"] * 4
+    assert len(esperas) == 3
+
+
+def test_concurrencia_aimd():
+    gobernador = GobernadorRedmine(rps=0, concurrencia_max=4, latencia_objetivo=1.0)
+    for _ in range(20):
+        gobernador._ajustar(0.1, error=False)
+    assert gobernador.limite == 4
+
+    gobernador._ajustar(0.1, error=True)
+    assert gobernador.limite == 2
+    gobernador._ajustar(5.0, error=False)  # latencia alta cuenta como congestión
+    assert gobernador.limite == 1
@@ -0,0 +1,48 @@
+# tests/test_snapshots.py
+from datetime import date, timedelta
+
+from app.services import report_service
+from app.utils import snapshot_store
+from app.utils.snapshot_store import guardar_snapshot, tendencia
+
+
+def _fila(equipo, horas, version="v1.0"):
+    return {"Equipo": equipo, "Proyecto": "P", "Version": version, "Horas insumidas": horas}
+
+
+def test_tendencia_toma_el_ultimo_snapshot_de_cada_equipo(entorno):
+    lunes = date.today() - timedelta(days=date.today().weekday() + 7)
+    guardar_snapshot([_fila("KZN DATA", 10)], fecha=lunes)
+    guardar_snapshot([_fila("KZN DESARROLLO", 5)], fecha=lunes + timedelta(days=1))
+
+    [semana] = tendencia(semanas=4)
+    assert (semana["valor"], semana["versiones"]) == (15, 2)
+
+    # El filtro se aplica antes de elegir el corte: DATA no se corrió el martes
+    assert [p["valor"] for p in tendencia(semanas=4, equipo="KZN DATA")] == [10]
+    assert [p["valor"] for p in tendencia(semanas=4, equipo="KZN DATA", granularidad="dia")] == [10]
+
+
+def test_reporte_de_un_equipo_no_oculta_a_los_demas(redmine):
+    report_service.obtener_datos()
+    ayer = date.today() - timedelta(days=1)
+    with snapshot_store._conectar() as conn:
+        conn.execute("UPDATE snapshot SET fecha = ?", (ayer.isoformat(),))
+    data_ayer = [r for r in snapshot_store.ultimo_snapshot() if r["Equipo"] == "KZN DESARROLLO"]
+
+    report_service.obtener_datos(equipo="data")
+
+    data = snapshot_store.ultimo_snapshot()
+    assert {r["Equipo"] for r in data} == {"KZN DATA", "KZN DESARROLLO"}
+    assert [r for r in data if r["Equipo"] == "KZN DESARROLLO"] == data_ayer
+    assert snapshot_store.fecha_ultimo_snapshot() == date.today()
+
+
+def test_equipos_sin_snapshot_reciente_dejan_de_mostrarse(entorno):
+    hoy = date.today()
+    guardar_snapshot([_fila("KZN DATA", 1)], fecha=hoy)
+    guardar_snapshot([_fila("KZN DESARROLLO", 2)], fecha=hoy - timedelta(days=snapshot_store.SNAPSHOT_EQUIPO_MAX_DIAS))
+    guardar_snapshot([_fila("KZN VIEJO", 3)], fecha=hoy - timedelta(days=snapshot_store.SNAPSHOT_EQUIPO_MAX_DIAS + 1))
+
+    assert {r["Equipo"] for r in snapshot_store.ultimo_snapshot()} == {"KZN DATA", "KZN DESARROLLO"}
+    assert snapshot_store.ultimo_snapshot(equipo="KZN VIEJO") == []
@@ -0,0 +1,82 @@
+# tests/test_ventanas.py
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.utils import redmine_client, snapshot_store
+from app.utils.fecha import nombres_ventanas, rangos_ventanas
+
+
+def test_rangos_ventanas():
+    # Miércoles 2024-05-15
+    rangos = rangos_ventanas(datetime(2024, 5, 15, 10, 30), "semana, 30d, 90d, mes, trimestre")
+
+    assert rangos == {
+        "última semana": (date(2024, 5, 5), date(2024, 5, 11)),
+        "últimos 30 días": (date(2024, 4, 15), date(2024, 5, 15)),
+        "últimos 90 días": (date(2024, 2, 15), date(2024, 5, 15)),
+        "mes en curso": (date(2024, 5, 1), date(2024, 5, 15)),
+        "trimestre en curso": (date(2024, 4, 1), date(2024, 5, 15)),
+    }
+
+
+def test_ventana_desconocida():
+    with pytest.raises(ValueError):
+        nombres_ventanas("semana,anual")
+
+
+def test_conteo_por_ventana_igual_al_recorrido_lineal():
+    hoy = datetime(2024, 5, 15)
+    fechas = sorted(hoy.date() - timedelta(days=d) for d in (0, 1, 1, 4, 10, 10, 31, 45, 89, 90, 91, 200))
+    acc = {
+        "Version": "v1", "Fecha de inicio": None, "Fecha finalización": None,
+        "Tareas totales": len(fechas), "Tareas abiertas": 0,
+        "Horas estimadas": 0.0, "Horas insumidas": 0.0,
+        "cerradas": fechas, "modificadas": fechas,
+    }
+    ventanas = rangos_ventanas(hoy, "semana,30d,90d,mes,trimestre")
+
+    fila = redmine_client._fila_version("KZN DATA", "P", acc, ventanas)
+
+    for nombre, (desde, hasta) in ventanas.items():
+        esperado = sum(1 for f in fechas if desde <= f <= hasta)
+        assert fila[f"Tareas cerradas {nombre}"] == fila[f"Tareas modificadas {nombre}"] == esperado
+
+
+def test_snapshot_guarda_y_restaura_las_ventanas_configuradas(entorno, monkeypatch):
+    fila = {"Equipo": "KZN DATA", "Proyecto": "P", "Version": "v1", "Horas insumidas": 1.5}
+    for nombre in nombres_ventanas("semana,90d,mes"):
+        fila[f"Tareas modificadas {nombre}"] = fila[f"Tareas cerradas {nombre}"] = 3
+    monkeypatch.setattr(snapshot_store, "COLUMNAS", snapshot_store.columnas("semana,90d,mes"))
+    monkeypatch.setattr(snapshot_store, "COLUMNAS_VENTANAS", snapshot_store._columnas_ventanas("semana,90d,mes"))
+
+    snapshot_store.guardar_snapshot([fila])
+    [restaurada] = snapshot_store.ultimo_snapshot()
+
+    assert {k: v for k, v in restaurada.items() if v is not None} == fila
+    assert not any("30 días" in k for k in restaurada)
+    assert snapshot_store.tendencia("tareas_mod_semana")[0]["valor"] == 3
+    with pytest.raises(ValueError, match="solo semana y 30d"):
+        snapshot_store.tendencia("tareas_mod_30")  # 30d no está configurada: sin serie, con error claro
+
+    # Con otra configuración solo vuelven las ventanas vigentes
+    monkeypatch.setattr(snapshot_store, "COLUMNAS", snapshot_store.columnas("30d"))
+    monkeypatch.setattr(snapshot_store, "COLUMNAS_VENTANAS", snapshot_store._columnas_ventanas("30d"))
+    [restaurada] = snapshot_store.ultimo_snapshot()
+
+    assert [k for k in restaurada if k.startswith("Tareas ")] == ["Tareas totales", "Tareas abiertas",
+                                                                 "Tareas modificadas últimos 30 días", "Tareas cerradas últimos 30 días"]
+
+
+def test_api_tendencias_rechaza_metricas_sin_serie(entorno, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(snapshot_store, "COLUMNAS", snapshot_store.columnas("semana,90d"))
+    cliente = TestClient(main.app)
+
+    assert cliente.get("/api/tendencias", params={"metrica": "tareas_mod_semana"}).status_code == 200
+    respuesta = cliente.get("/api/tendencias", params={"metrica": "tareas_mod_30"})
+    assert respuesta.status_code == 400
+    assert "tareas_mod_semana" in respuesta.json()["detail"]
@@ -0,0 +1,102 @@
+# tests/test_versiones_cerradas.py
+import os
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from app.utils import cache_manager, redmine_client
+from tests.redmine_falso import organizacion
+
+# 120 tareas por proyecto: 2 páginas de issues, 1 sin las 30 de la versión cerrada
+ORG_GRANDE = dict(equipos=("KZN DATA",), clientes=1, proyectos=2, issues=120)
+
+
+@pytest.fixture
+def org(redmine):
+    redmine.engine.org = organizacion(**ORG_GRANDE)
+    return redmine.engine.org
+
+
+def _correr(redmine, politica, monkeypatch):
+    monkeypatch.setattr(redmine_client, "VERSIONES_CERRADAS", politica)
+    redmine.engine.llamadas.clear()
+    return redmine_client.process_projects(redmine_client.get_projects(), incremental=False)
+
+
+def _por_version(filas):
+    return {(f["Proyecto"], f["Version"]): f for f in filas}
+
+
+def test_congela_versiones_cerradas_y_no_vuelve_a_pedirlas(org, redmine, monkeypatch):
+    completo = _correr(redmine, "incluir", monkeypatch)
+    paginas_completo = redmine.engine.llamadas["/issues.json"]
+
+    primera = _correr(redmine, "congelar", monkeypatch)
+    assert redmine.engine.llamadas["/issues.json"] == paginas_completo
+
+    segunda = _correr(redmine, "congelar", monkeypatch)
+    assert redmine.engine.llamadas["/issues.json"] < paginas_completo
+    assert redmine.engine.llamadas["/projects/:id/versions.json"] == 2
+
+    assert _por_version(primera) == _por_version(segunda) == _por_version(completo)
+
+
+def test_omitir_excluye_las_versiones_cerradas(org, redmine, monkeypatch):
+    filas = _correr(redmine, "omitir", monkeypatch)
+
+    assert filas and not any(f["Version"] == "v0.0" for f in filas)
+    assert {f["Version"] for f in filas} == {"v1.0", "Sin versión"}
+
+
+def test_version_reabierta_se_vuelve_a_pedir(org, redmine, monkeypatch):
+    _correr(redmine, "congelar", monkeypatch)
+    pid = next(iter(org["versions"]))
+    assert cache_manager.load_versiones_congeladas(pid)
+
+    org["versions"][pid][0]["status"] = "open"
+    _correr(redmine, "congelar", monkeypatch)
+
+    assert cache_manager.load_versiones_congeladas(pid) == {}
+
+
+def test_proyectos_chicos_no_piden_versiones(redmine, monkeypatch):
+    _correr(redmine, "congelar", monkeypatch)
+
+    assert redmine.engine.llamadas["/projects/:id/versions.json"] == 0
+
+
+def test_versiones_congeladas_se_reagregan_periodicamente(org, redmine, monkeypatch):
+    _correr(redmine, "congelar", monkeypatch)
+    pid = next(iter(org["versions"]))
+    issue = next(i for i in org["issues"] if i["project"]["id"] == pid and (i.get("fixed_version") or {}).get("id") == pid * 10)
+    issue["estimated_hours"] = (issue["estimated_hours"] or 0) + 100
+
+    # Editar un issue no cambia la versión: mientras esté vigente se sigue usando el acumulado guardado
+    antes = _por_version(_correr(redmine, "congelar", monkeypatch))
+    clave = next(k for k in antes if k[1] == "v0.0" and k[0] == issue["project"]["name"])
+
+    congeladas = cache_manager.load_versiones_congeladas(pid)
+    for g in congeladas.values():
+        g["congelada"] -= timedelta(days=cache_manager.PROJECT_STATE_MAX_DAYS + 1)
+    cache_manager.save_versiones_congeladas(pid, congeladas)
+
+    despues = _por_version(_correr(redmine, "congelar", monkeypatch))
+
+    assert despues[clave]["Horas estimadas"] == antes[clave]["Horas estimadas"] + 100
+    assert cache_manager.load_versiones_congeladas(pid)[pid * 10]["congelada"] == date.today()
+
+
+def test_prune_elimina_versiones_congeladas_de_proyectos_inactivos(org, redmine, monkeypatch):
+    _correr(redmine, "congelar", monkeypatch)
+    pids = {pid for pid in org["versions"] if cache_manager.load_versiones_congeladas(pid)}
+    activo = min(pids)
+    viejo = time.time() - 100 * 86400
+    for nombre in os.listdir(cache_manager.BACKEND.dir):
+        os.utime(os.path.join(cache_manager.BACKEND.dir, nombre), (viejo, viejo))
+
+    eliminadas = cache_manager.prune_cache(activos={activo}, max_age_days=30, max_mb=0)
+
+    assert {f"{cache_manager.VERSIONES_PREFIX}{pid}" for pid in pids - {activo}} <= set(eliminadas)
+    assert cache_manager.load_versiones_congeladas(activo)
+    assert not any(cache_manager.load_versiones_congeladas(pid) for pid in pids - {activo})
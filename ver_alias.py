@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from redminelib import Redmine
+from app.utils.redmine_governor import crear_redmine
 
 # ───────────────────────────────
 # Cargar .env desde la raíz
@@ -19,7 +19,7 @@ if not REDMINE_URL or not API_KEY:
 # ───────────────────────────────
 # Conexión Redmine
 # ───────────────────────────────
-redmine = Redmine(REDMINE_URL.rstrip("/"), key=API_KEY)
+redmine = crear_redmine(REDMINE_URL, API_KEY)
 
 try:
     user = redmine.user.get("current")